@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.func import explicit_pub_date
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    """Тесты JSON API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        now = timezone.now()
+        # Три поста с одной датой проверяют курсор при равных pub_date
+        dates = [now] * 3 + [now - timedelta(hours=i) for i in range(1, 5)]
+        with explicit_pub_date(Post):
+            cls.posts = [
+                Post.objects.create(
+                    author=cls.author,
+                    group=cls.group if number % 2 else None,
+                    text=f'Пост {number}',
+                    pub_date=date,
+                )
+                for number, date in enumerate(dates)
+            ]
+        cls.post = cls.posts[0]
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_list_cursor(self):
+        """Курсор проходит все посты без повторов и пропусков."""
+        url = reverse('api:post_list')
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(
+                url, {'limit': 2, 'cursor': cursor, 'fields': 'id'}
+            )
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen += [post['id'] for post in data['results']]
+            cursor = data['next']
+        expected = list(Post.objects.order_by('-pub_date', 'pk').values_list(
+            'pk', flat=True
+        ))
+        self.assertEqual(seen, expected)
+
+    def test_post_list_filters(self):
+        response = self.client.get(
+            reverse('api:post_list'), {'group': 'test-slug', 'fields': 'id'}
+        )
+        self.assertEqual(
+            {post['id'] for post in response.json()['results']},
+            set(self.group.posts.values_list('pk', flat=True))
+        )
+        response = self.client.get(
+            reverse('api:post_list'), {'author': 'reader'}
+        )
+        self.assertEqual(response.json(), {'results': [], 'next': None})
+        response = self.client.get(
+            reverse('api:post_list'), {'group': 'missing'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fields(self):
+        """В SELECT только запрошенные поля, без лишних соединений."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api:post_detail', args=[self.post.pk]),
+                {'fields': 'id,text'}
+            )
+        self.assertEqual(
+            response.json(), {'id': self.post.pk, 'text': self.post.text}
+        )
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"image"', sql)
+        response = self.client.get(
+            reverse('api:post_detail', args=[self.post.pk]),
+            {'fields': 'author,group'}
+        )
+        self.assertEqual(response.json(), {'author': 'author', 'group': None})
+
+    def test_batch_ids(self):
+        """?ids= - один запрос, порядок как в запросе, отсутствующие id."""
+        ids = [self.posts[3].pk, 0, self.posts[1].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('api:post_list'),
+                {'ids': ','.join(map(str, ids)), 'fields': 'id'}
+            )
+        self.assertEqual(response.json(), {
+            'results': [{'id': self.posts[3].pk}, {'id': self.posts[1].pk}],
+            'missing': [0],
+        })
+
+    def test_post_etag(self):
+        """Повтор запроса поста с ETag - 304 без обращения к базе."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_etag(self):
+        url = reverse('api:group_detail', args=['test-slug'])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_groups_profiles(self):
+        response = self.client.get(
+            reverse('api:comment_list', args=[self.post.pk])
+        )
+        self.assertEqual(
+            [comment['text'] for comment in response.json()['results']],
+            ['Комментарий']
+        )
+        response = self.client.get(reverse('api:group_list'))
+        self.assertEqual(
+            [group['slug'] for group in response.json()['results']],
+            ['test-slug']
+        )
+        response = self.client.get(
+            reverse('api:profile_detail', args=['author']),
+            {'fields': 'username,posts_count,followers_count,'
+                       'following_count'}
+        )
+        self.assertEqual(response.json(), {
+            'username': 'author', 'posts_count': 7, 'followers_count': 1,
+            'following_count': 0,
+        })
+
+    @override_settings(API_MAX_LIMIT=5)
+    def test_errors(self):
+        """Неверные параметры - 400 с описанием, несуществующее - 404."""
+        url = reverse('api:post_list')
+        cases = (
+            {'fields': 'id,password'},
+            {'cursor': 'испорчен'},
+            {'limit': 'много'},
+            {'limit': 6},
+            {'ids': 'a,b'},
+            {'ids': '1,2,3,4,5,6'},
+        )
+        for params in cases:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+        response = self.client.get(reverse('api:post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 405)
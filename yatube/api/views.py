@@ -0,0 +1,266 @@
+"""
+JSON API только для чтения: посты, комментарии, группы и профили.
+
+* ?fields=id,text,author - в ответе и в SELECT только эти поля,
+  соединения с авторами и группами - только если они запрошены;
+* ?cursor= - курсорная пагинация (posts.func.cursor_page), курсор
+  следующей страницы - в поле next;
+* /api/posts/?ids=1,2,3 - пакетное получение постов одним запросом;
+* ETag: для постов он зависит только от момента последнего изменения
+  постов и проверяется до обращения к базе, для остального - хэш ответа.
+"""
+import hashlib
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from posts.func import cursor_page, posts_etag
+from posts.models import Comment, Follow, Group, Post, User
+
+# Поле API -> путь поля в ORM
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'pub_date': 'pub_date',
+}
+GROUP_FIELDS = {
+    'id': 'pk',
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+PROFILE_FIELDS = {
+    'id': 'pk',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+}
+# Поля профиля, которые считаются, только если запрошены: модель и её
+# поле, ссылающееся на пользователя
+PROFILE_COUNTS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """GET/HEAD, ответ в JSON, ошибки - в JSON с кодом ответа."""
+    @require_safe
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {'detail': str(error)}, status=error.status.value
+            )
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+def json_response(request, data, content_etag=True):
+    """
+    Ответ в JSON. content_etag - выставить ETag по содержимому и ответить
+    304, если он совпал с If-None-Match.
+    """
+    response = JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, no_cache=True)
+    if not content_etag:
+        return response
+    etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def parse_fields(request, fields):
+    """Запрошенные поля API (все, если ?fields= нет)."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(fields)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(names) - set(fields)
+    if unknown:
+        raise ApiError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}; '
+            f'доступны: {", ".join(fields)}'
+        )
+    return names
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_LIMIT))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {settings.API_MAX_LIMIT}')
+    return limit
+
+
+def get_or_404(queryset, **lookup):
+    row = queryset.filter(**lookup).first()
+    if row is None:
+        raise ApiError('Не найдено', HTTPStatus.NOT_FOUND)
+    return row
+
+
+def select(queryset, fields, names, *extra):
+    """values() только с нужными полями (и служебными extra)."""
+    paths = {fields[name] for name in names} | set(extra)
+    return queryset.values(*paths)
+
+
+def serialize(row, fields, names):
+    data = {name: row[fields[name]] for name in names}
+    if data.get('image') is not None:
+        data['image'] = (
+            default_storage.url(data['image']) if data['image'] else None
+        )
+    return data
+
+
+def paginated(request, queryset, fields):
+    """Страница записей по курсору с полями из ?fields=."""
+    names = parse_fields(request, fields)
+    try:
+        rows, cursor = cursor_page(
+            select(queryset, fields, names, 'pk', 'pub_date'),
+            request.GET.get('cursor'), parse_limit(request)
+        )
+    except ValueError as error:
+        raise ApiError(str(error))
+    return {
+        'results': [serialize(row, fields, names) for row in rows],
+        'next': cursor,
+    }
+
+
+def posts_by_ids(request, names):
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise ApiError('ids - список id через запятую')
+    if len(ids) > settings.API_MAX_LIMIT:
+        raise ApiError(f'Не больше {settings.API_MAX_LIMIT} id за раз')
+    rows = {
+        row['pk']: row
+        for row in select(Post.objects, POST_FIELDS, names, 'pk')
+        .filter(pk__in=ids).order_by()
+    }
+    return {
+        'results': [
+            serialize(rows[pk], POST_FIELDS, names)
+            for pk in ids if pk in rows
+        ],
+        'missing': [pk for pk in ids if pk not in rows],
+    }
+
+
+@api_view
+@condition(etag_func=posts_etag)
+def post_list(request):
+    """Лента постов, фильтры ?group=slug и ?author=username, или ?ids=."""
+    if 'ids' in request.GET:
+        data = posts_by_ids(request, parse_fields(request, POST_FIELDS))
+        return json_response(request, data, content_etag=False)
+    posts = Post.objects.all()
+    if 'group' in request.GET:
+        posts = posts.filter(
+            group=get_or_404(Group.objects, slug=request.GET['group'])
+        )
+    if 'author' in request.GET:
+        posts = posts.filter(
+            author=get_or_404(User.objects, username=request.GET['author'])
+        )
+    return json_response(
+        request, paginated(request, posts, POST_FIELDS), content_etag=False
+    )
+
+
+@api_view
+@condition(etag_func=posts_etag)
+def post_detail(request, post_id):
+    names = parse_fields(request, POST_FIELDS)
+    row = get_or_404(select(Post.objects, POST_FIELDS, names), pk=post_id)
+    return json_response(
+        request, serialize(row, POST_FIELDS, names), content_etag=False
+    )
+
+
+@api_view
+def comment_list(request, post_id):
+    """Комментарии к посту, от новых к старым."""
+    post = get_or_404(Post.objects.values('pk'), pk=post_id)
+    comments = Comment.objects.filter(post_id=post['pk'])
+    return json_response(
+        request, paginated(request, comments, COMMENT_FIELDS)
+    )
+
+
+@api_view
+def group_list(request):
+    names = parse_fields(request, GROUP_FIELDS)
+    groups = select(Group.objects.order_by('pk'), GROUP_FIELDS, names)
+    return json_response(request, {
+        'results': [serialize(row, GROUP_FIELDS, names) for row in groups],
+    })
+
+
+@api_view
+def group_detail(request, slug):
+    names = parse_fields(request, GROUP_FIELDS)
+    row = get_or_404(select(Group.objects, GROUP_FIELDS, names), slug=slug)
+    return json_response(request, serialize(row, GROUP_FIELDS, names))
+
+
+def count_subquery(model, field):
+    """
+    Число строк model, ссылающихся на пользователя, отдельным
+    подзапросом: JOIN сразу нескольких связей перемножил бы их строки.
+    """
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(
+            counts.values(field).annotate(count=Count('*')).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+@api_view
+def profile_detail(request, username):
+    """Профиль автора; счётчики считаются, только если запрошены."""
+    fields = dict(PROFILE_FIELDS, **{name: name for name in PROFILE_COUNTS})
+    names = parse_fields(request, fields)
+    profiles = User.objects.filter(is_active=True).annotate(**{
+        name: count_subquery(*PROFILE_COUNTS[name])
+        for name in names if name in PROFILE_COUNTS
+    })
+    row = get_or_404(
+        select(profiles, fields, names), username=username
+    )
+    return json_response(request, serialize(row, fields, names))
@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .slow_queries import install
+
+        connection_created.connect(install)
+        if settings.NPLUSONE_DETECTION:
+            from . import nplusone
+
+            nplusone.install()
@@ -0,0 +1,22 @@
+"""Вспомогательные функции для замеров производительности."""
+import math
+
+
+def percentile(values, q):
+    """Перцентиль q (0-100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """p50, p95, p99 и среднее для списка длительностей в секундах."""
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values) if values else 0.0,
+    }
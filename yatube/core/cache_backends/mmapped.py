@@ -0,0 +1,381 @@
+"""
+Кэш в разделяемом memory-mapped файле.
+
+Все воркеры, запущенные на одной машине, открывают один и тот же файл,
+поэтому отрендеренный фрагмент страницы виден каждому процессу без
+внешнего сервиса кэширования.
+
+Структура файла:
+    заголовок | хэш-индекс (открытая адресация) | область данных
+
+Доступ из нескольких процессов синхронизируется через flock, внутри
+процесса - через обычную блокировку потоков. Когда область данных
+заполнена, записи вытесняются в порядке давности последнего обращения
+(LRU) до тех пор, пока новая запись не поместится в бюджет MAX_SIZE.
+Удалённые записи оставляют в индексе «надгробия»; когда их становится
+больше 1/TOMBSTONE_FRACTION слотов, файл перестраивается без них.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import stat
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+MAGIC = b'YTMC'
+FORMAT_VERSION = 2
+
+# magic, версия формата, число слотов, размер данных, занято байт, записей,
+# надгробий
+HEADER = struct.Struct('<4sIIQQII')
+# дайджест ключа, смещение, длина, время истечения, время обращения
+SLOT = struct.Struct('<16sQIdd')
+# длина ключа в начале каждой записи области данных
+KEY_LENGTH = struct.Struct('<I')
+
+EMPTY = bytes(16)
+TOMBSTONE = b'\xff' * 16
+
+# Размер области данных по умолчанию
+DEFAULT_MAX_SIZE: int = 64 * 1024 * 1024
+
+# Доля слотов под надгробиями, после которой файл перестраивается
+TOMBSTONE_FRACTION: int = 4
+
+
+class MmapCache(BaseCache):
+    """Кэш-бэкенд, хранящий записи в memory-mapped файле."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._data_size = int(options.get('MAX_SIZE', DEFAULT_MAX_SIZE))
+        # Держим индекс заполненным не более чем наполовину
+        self._slots = self._max_entries * 2
+        self._data_start = HEADER.size + self._slots * SLOT.size
+        self._file_size = self._data_start + self._data_size
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mm = None
+
+    # Работа с файлом
+
+    def _open(self):
+        """Открывает файл заново в каждом процессе после fork."""
+        if self._pid == os.getpid():
+            return
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, 0o700, exist_ok=True)
+        fd = os.open(
+            self._path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600
+        )
+        try:
+            self._check_owner(fd)
+        except ImproperlyConfigured:
+            os.close(fd)
+            raise
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self._file_size:
+                os.ftruncate(fd, self._file_size)
+            mm = mmap.mmap(fd, self._file_size)
+            magic, version, slots, data_size, *_ = HEADER.unpack_from(mm)
+            if (magic, version, slots, data_size) != (
+                    MAGIC, FORMAT_VERSION, self._slots, self._data_size):
+                self._reset(mm)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._mm, self._pid = fd, mm, os.getpid()
+
+    def _check_owner(self, fd):
+        """
+        Записи распаковываются pickle, поэтому файл, который мог подложить
+        или изменить другой пользователь, не открывается.
+        """
+        info = os.fstat(fd)
+        if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o600:
+            raise ImproperlyConfigured(
+                f'{self._path}: файл кэша должен принадлежать текущему '
+                f'пользователю и иметь права 0600'
+            )
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._mm
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _reset(self, mm):
+        mm[:self._data_start] = bytes(self._data_start)
+        self._write_header(mm, 0, 0, 0)
+
+    def _write_header(self, mm, used, count, tombstones):
+        HEADER.pack_into(
+            mm, 0, MAGIC, FORMAT_VERSION, self._slots, self._data_size,
+            used, count, tombstones
+        )
+
+    def _read_header(self, mm):
+        _, _, _, _, used, count, tombstones = HEADER.unpack_from(mm)
+        return used, count, tombstones
+
+    def _slot_offset(self, index):
+        return HEADER.size + index * SLOT.size
+
+    def _read_slot(self, mm, index):
+        return SLOT.unpack_from(mm, self._slot_offset(index))
+
+    def _write_slot(self, mm, index, *values):
+        SLOT.pack_into(mm, self._slot_offset(index), *values)
+
+    # Хэш-индекс
+
+    @staticmethod
+    def _digest(key):
+        digest = hashlib.md5(key.encode()).digest()
+        # Дайджест не должен совпадать со служебными значениями слотов
+        if digest in (EMPTY, TOMBSTONE):
+            digest = digest[:-1] + b'\x01'
+        return digest
+
+    def _find(self, mm, key, digest):
+        """
+        Ищет ключ в индексе.
+        Возвращает (индекс найденного слота, индекс свободного слота).
+        """
+        encoded = key.encode()
+        free = None
+        start = int.from_bytes(digest[:8], 'little') % self._slots
+        for step in range(self._slots):
+            index = (start + step) % self._slots
+            slot_digest, offset, length, _, _ = self._read_slot(mm, index)
+            if slot_digest == EMPTY:
+                return None, index if free is None else free
+            if slot_digest == TOMBSTONE:
+                if free is None:
+                    free = index
+                continue
+            if slot_digest == digest:
+                position = self._data_start + offset
+                (key_length,) = KEY_LENGTH.unpack_from(mm, position)
+                start_key = position + KEY_LENGTH.size
+                if mm[start_key:start_key + key_length] == encoded:
+                    return index, free
+        return None, free
+
+    def _live_slot(self, mm, key, now):
+        """Возвращает индекс слота с неистёкшей записью или None."""
+        index, _ = self._find(mm, key, self._digest(key))
+        if index is None:
+            return None
+        expires = self._read_slot(mm, index)[3]
+        if expires and expires <= now:
+            self._remove(mm, index)
+            return None
+        return index
+
+    def _remove(self, mm, index):
+        self._write_slot(mm, index, TOMBSTONE, 0, 0, 0, 0)
+        used, count, tombstones = self._read_header(mm)
+        self._write_header(mm, used, count - 1, tombstones + 1)
+        if tombstones + 1 > self._slots // TOMBSTONE_FRACTION:
+            # Длинные цепочки надгробий замедляют каждый поиск
+            self._compact(mm, 0, time.time(), evict=False)
+
+    def _entry(self, mm, index):
+        _, offset, length, _, _ = self._read_slot(mm, index)
+        position = self._data_start + offset
+        return bytes(mm[position:position + length])
+
+    @staticmethod
+    def _pack(key, value):
+        encoded = key.encode()
+        return (
+            KEY_LENGTH.pack(len(encoded))
+            + encoded
+            + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        )
+
+    @staticmethod
+    def _unpack(entry):
+        (key_length,) = KEY_LENGTH.unpack_from(entry)
+        return pickle.loads(entry[KEY_LENGTH.size + key_length:])
+
+    def _store(self, mm, key, entry, expires, now):
+        """Записывает запись, при необходимости вытесняя старые."""
+        index = self._live_slot(mm, key, now)
+        if index is not None:
+            self._remove(mm, index)
+        used, count, _ = self._read_header(mm)
+        if (used + len(entry) > self._data_size
+                or count + 1 >= self._max_entries):
+            self._compact(mm, len(entry), now)
+            used, count, _ = self._read_header(mm)
+        digest = self._digest(key)
+        _, free = self._find(mm, key, digest)
+        position = self._data_start + used
+        mm[position:position + len(entry)] = entry
+        # Слот мог быть надгробием
+        tombstones = self._read_header(mm)[2]
+        if self._read_slot(mm, free)[0] == TOMBSTONE:
+            tombstones -= 1
+        self._write_slot(mm, free, digest, used, len(entry), expires, now)
+        self._write_header(mm, used + len(entry), count + 1, tombstones)
+
+    def _compact(self, mm, needed, now, evict=True):
+        """
+        Уплотняет область данных: отбрасывает истёкшие записи и надгробия
+        и вытесняет давно не использованные, пока не освободится место под
+        needed байт. Освобождаем с запасом (1/CULL_FREQUENCY бюджета),
+        чтобы не уплотнять файл при каждой записи. С evict=False живые
+        записи только переносятся, без вытеснения.
+        """
+        live = []
+        for index in range(self._slots):
+            digest, offset, length, expires, accessed = self._read_slot(
+                mm, index
+            )
+            if digest in (EMPTY, TOMBSTONE):
+                continue
+            if expires and expires <= now:
+                continue
+            live.append((accessed, digest, expires, self._entry(mm, index)))
+        live.sort(key=lambda item: item[0], reverse=True)
+        if not evict:
+            return self._rewrite(mm, live)
+        reserve = self._data_size // self._cull_frequency
+        budget = max(self._data_size - reserve, 0) - needed
+        max_count = self._max_entries - max(
+            self._max_entries // self._cull_frequency, 1
+        )
+        kept, total = [], 0
+        for item in live:
+            if total + len(item[3]) > budget or len(kept) >= max_count:
+                break
+            kept.append(item)
+            total += len(item[3])
+        self._rewrite(mm, kept)
+
+    def _rewrite(self, mm, kept):
+        """Записывает файл заново только с записями kept."""
+        self._reset(mm)
+        used = 0
+        for accessed, digest, expires, entry in kept:
+            position = self._data_start + used
+            mm[position:position + len(entry)] = entry
+            start = int.from_bytes(digest[:8], 'little') % self._slots
+            for step in range(self._slots):
+                index = (start + step) % self._slots
+                if self._read_slot(mm, index)[0] == EMPTY:
+                    break
+            self._write_slot(
+                mm, index, digest, used, len(entry), expires, accessed
+            )
+            used += len(entry)
+        self._write_header(mm, used, len(kept), 0)
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0 if expires is None else expires
+
+    # API кэша Django
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        entry = self._pack(key, value)
+        if len(entry) > self._data_size:
+            return False
+        with self._locked() as mm:
+            now = time.time()
+            if self._live_slot(mm, key, now) is not None:
+                return False
+            self._store(mm, key, entry, self._expires(timeout), now)
+            return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._locked() as mm:
+            now = time.time()
+            index = self._live_slot(mm, key, now)
+            if index is None:
+                return default
+            digest, offset, length, expires, _ = self._read_slot(mm, index)
+            self._write_slot(mm, index, digest, offset, length, expires, now)
+            entry = self._entry(mm, index)
+        return self._unpack(entry)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        entry = self._pack(key, value)
+        with self._locked() as mm:
+            now = time.time()
+            if len(entry) > self._data_size:
+                # Значение больше всего бюджета - просто забываем старое
+                index = self._live_slot(mm, key, now)
+                if index is not None:
+                    self._remove(mm, index)
+                return
+            self._store(mm, key, entry, self._expires(timeout), now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._locked() as mm:
+            now = time.time()
+            index = self._live_slot(mm, key, now)
+            if index is None:
+                return False
+            digest, offset, length, _, _ = self._read_slot(mm, index)
+            self._write_slot(
+                mm, index, digest, offset, length,
+                self._expires(timeout), now
+            )
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._locked() as mm:
+            now = time.time()
+            index = self._live_slot(mm, key, now)
+            if index is None:
+                raise ValueError("Key '%s' not found" % key)
+            expires = self._read_slot(mm, index)[3]
+            value = self._unpack(self._entry(mm, index)) + delta
+            self._store(mm, key, self._pack(key, value), expires, now)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._locked() as mm:
+            return self._live_slot(mm, key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._locked() as mm:
+            index = self._live_slot(mm, key, time.time())
+            if index is not None:
+                self._remove(mm, index)
+
+    def clear(self):
+        with self._locked() as mm:
+            self._reset(mm)
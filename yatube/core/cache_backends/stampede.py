@@ -0,0 +1,139 @@
+"""
+Защита от cache stampede.
+
+Обёртка над другим кэшем (LOCATION - его алиас в CACHES). Через неё
+работают и тег {% cache %}, и cache_page, так что защита включается для
+них без изменений шаблонов и представлений.
+
+Каждое значение хранится вместе с «мягким» временем истечения и временем,
+которое ушло на его вычисление. Сама запись в нижележащем кэше живёт
+дольше на STALE_TIMEOUT секунд. При чтении:
+  * запись может быть признана устаревшей немного раньше срока
+    (вероятностный пересчёт XFetch: чем дороже вычисление, тем раньше);
+  * пересчитывать идёт только тот, кто захватил блокировку, для него get
+    возвращает промах;
+  * остальные в это время получают устаревшее значение.
+"""
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import instrumentation
+
+LOCK_SUFFIX = ':stampede-lock'
+
+# Сколько последних промахов потока помнить: ключи, которые читают,
+# но так и не записывают, не должны копиться бесконечно
+MAX_MISSES: int = 1000
+
+
+# Значение, мягкое время истечения и длительность пересчёта
+Envelope = namedtuple('Envelope', ('value', 'expires', 'delta'))
+
+
+class StampedeProtectedCache(BaseCache):
+    """Кэш с вероятностным ранним пересчётом и single-flight блокировкой."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._alias = location
+        self._beta = float(options.get('BETA', 1.0))
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._stale_timeout = options.get('STALE_TIMEOUT', 60)
+        # Моменты промахов текущего потока: по ним считаем время пересчёта
+        self._local = threading.local()
+
+    @property
+    def _cache(self):
+        return caches[self._alias]
+
+    def _misses(self):
+        if not hasattr(self._local, 'misses'):
+            self._local.misses = OrderedDict()
+        return self._local.misses
+
+    def _lock_key(self, key):
+        return f'{key}{LOCK_SUFFIX}'
+
+    def _miss(self, key, version, default):
+        misses = self._misses()
+        misses.pop((key, version), None)
+        misses[(key, version)] = time.monotonic()
+        if len(misses) > MAX_MISSES:
+            misses.popitem(last=False)
+        instrumentation.record_cache(hit=False)
+        return default
+
+    @staticmethod
+    def _hit(value):
+        instrumentation.record_cache(hit=True)
+        return value
+
+    def _wrap(self, key, value, timeout, version):
+        started = self._misses().pop((key, version), None)
+        delta = 0.0 if started is None else time.monotonic() - started
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return Envelope(value, None, delta), None
+        if timeout <= 0:
+            # Как и у других бэкендов: значение сразу истекает, устаревшим
+            # его тоже не отдаём
+            return Envelope(value, 0, delta), 0
+        expires = time.time() + timeout
+        return Envelope(value, expires, delta), timeout + self._stale_timeout
+
+    def get(self, key, default=None, version=None):
+        entry = self._cache.get(key, version=version)
+        if not isinstance(entry, Envelope):
+            if entry is not None:
+                return self._hit(entry)
+            return self._miss(key, version, default)
+        value, expires, delta = entry
+        if expires is None:
+            return self._hit(value)
+        # XFetch: now - delta * beta * ln(rand) >= expires
+        early = -delta * self._beta * math.log(1.0 - random.random())
+        if time.time() + early < expires:
+            return self._hit(value)
+        if self._cache.add(
+                self._lock_key(key), True, self._lock_timeout,
+                version=version):
+            return self._miss(key, version, default)
+        return self._hit(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        entry, timeout = self._wrap(key, value, timeout, version)
+        self._cache.set(key, entry, timeout, version=version)
+        self._cache.delete(self._lock_key(key), version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        entry, timeout = self._wrap(key, value, timeout, version)
+        return self._cache.add(key, entry, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        entry = self._cache.get(key, version=version)
+        if not isinstance(entry, Envelope):
+            return self._cache.touch(key, timeout, version=version)
+        entry, timeout = self._wrap(key, entry[0], timeout, version)
+        self._cache.set(key, entry, timeout, version=version)
+        return True
+
+    def has_key(self, key, version=None):
+        return self._cache.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._cache.delete(key, version=version)
+        self._cache.delete(self._lock_key(key), version=version)
+
+    def clear(self):
+        self._cache.clear()
+
+    def close(self, **kwargs):
+        self._cache.close(**kwargs)
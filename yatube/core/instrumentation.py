@@ -0,0 +1,85 @@
+"""
+Сбор показателей производительности текущего запроса.
+
+Middleware открывает сборщик в начале запроса, а база данных, шаблоны и
+кэш добавляют в него свои замеры. Вне запроса функции record_* ничего
+не делают.
+"""
+import threading
+import time
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Показатели одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'view': self.view_name,
+            'total_ms': round(self.elapsed * 1000, 2),
+            'db_queries': self.db_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+def stop():
+    metrics = current()
+    _local.metrics = None
+    return metrics
+
+
+def record_query(duration):
+    metrics = current()
+    if metrics is not None:
+        metrics.db_count += 1
+        metrics.db_time += duration
+
+
+def record_template(duration):
+    metrics = current()
+    if metrics is not None:
+        metrics.template_time += duration
+
+
+def record_cache(hit):
+    metrics = current()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def query_timer(execute, sql, params, many, context):
+    """execute_wrapper, засекающий время каждого запроса к базе."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(time.perf_counter() - started)
@@ -0,0 +1,398 @@
+"""
+Нагрузочное тестирование смешанным потоком запросов.
+
+Виртуальные пользователи в пуле потоков или процессов выполняют
+сценарии (просмотр лент, вход, публикация поста с картинкой,
+комментарий, подписка и отписка) в заданной пропорции. Запросы идут либо
+напрямую в yatube.wsgi.application в том же процессе, либо по HTTP на
+локальный порт. Результаты по каждому виду запроса: число, перцентили
+времени ответа и ошибки.
+"""
+import io
+import multiprocessing
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.signals import got_request_exception
+from django.db import connections
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+from core.benchmark import summarize
+from posts.models import Group, Post, User
+
+CSRF_PATTERN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+# Однопиксельная картинка для публикации постов
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+# Обработчик исключений запросов - один на процесс нагрузки
+EXCEPTION_RECEIVER_UID = 'core.loadtest.exceptions'
+
+DEFAULT_MIX = {
+    'browse': 70,
+    'login': 5,
+    'create': 5,
+    'comment': 10,
+    'follow': 10,
+}
+
+
+class InProcessTransport:
+    """Вызывает WSGI-приложение напрямую."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, body=b'', headers=None):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': 'localhost',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in (headers or {}).items():
+            key = name.upper().replace('-', '_')
+            if key != 'CONTENT_TYPE':
+                key = f'HTTP_{key}'
+            environ[key] = value
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split()[0])
+            started['headers'] = response_headers
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], content
+
+
+class HttpTransport:
+    """Отправляет запросы работающему серверу по HTTP."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.connection = None
+
+    def request(self, method, path, body=b'', headers=None):
+        if self.connection is None:
+            self.connection = HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body, headers or {})
+            response = self.connection.getresponse()
+            return response.status, response.getheaders(), response.read()
+        except Exception:
+            self.connection.close()
+            self.connection = None
+            raise
+
+
+class VirtualUser:
+    """Клиент со своими cookie, выполняющий сценарии нагрузки."""
+
+    def __init__(self, transport, data, results, rng):
+        self.transport = transport
+        self.data = data
+        self.results = results
+        self.random = rng
+        self.cookies = {}
+        self.logged_in = False
+
+    def request(self, label, method, path, body=b'', headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            )
+        started = time.perf_counter()
+        try:
+            status, response_headers, content = self.transport.request(
+                method, path, body, headers
+            )
+        except Exception as error:
+            self.results.record(
+                label, time.perf_counter() - started, None,
+                type(error).__name__
+            )
+            return None, b''
+        self.results.record(label, time.perf_counter() - started, status)
+        for name, value in response_headers:
+            if name.lower() == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return status, content
+
+    def csrf_token(self, label, path):
+        _, content = self.request(label, 'GET', path)
+        match = CSRF_PATTERN.search(content.decode(errors='ignore'))
+        return match.group(1) if match else ''
+
+    def post_form(self, label, path, fields, token):
+        body = urlencode(dict(fields, csrfmiddlewaretoken=token)).encode()
+        return self.request(label, 'POST', path, body, {
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+
+    def browse(self):
+        pages = self.random.randint(1, 5)
+        self.request('index', 'GET', f'/?page={pages}')
+        if self.data['groups']:
+            slug = self.random.choice(self.data['groups'])
+            self.request('group_list', 'GET', f'/group/{slug}/')
+        post_id = self.random.choice(self.data['posts'])
+        self.request('post_detail', 'GET', f'/posts/{post_id}/')
+        username = self.random.choice(self.data['users'])
+        self.request('profile', 'GET', f'/profile/{username}/')
+
+    def login(self):
+        self.cookies.clear()
+        token = self.csrf_token('login_form', '/auth/login/')
+        status, _ = self.post_form('login', '/auth/login/', {
+            'username': self.random.choice(self.data['users']),
+            'password': self.data['password'],
+        }, token)
+        self.logged_in = status == 302
+
+    def ensure_login(self):
+        if not self.logged_in:
+            self.login()
+        return self.logged_in
+
+    def create(self):
+        if not self.ensure_login():
+            return
+        token = self.csrf_token('post_create_form', '/create/')
+        image = SimpleUploadedFile('load.gif', SMALL_GIF, 'image/gif')
+        body = encode_multipart(BOUNDARY, {
+            'text': 'Нагрузочный пост',
+            'image': image,
+            'csrfmiddlewaretoken': token,
+        })
+        self.request('post_create', 'POST', '/create/', body, {
+            'Content-Type': MULTIPART_CONTENT,
+        })
+
+    def comment(self):
+        if not self.ensure_login():
+            return
+        post_id = self.random.choice(self.data['posts'])
+        token = self.csrf_token('post_detail', f'/posts/{post_id}/')
+        self.post_form(
+            'add_comment', f'/posts/{post_id}/comment/',
+            {'text': 'Нагрузочный комментарий'}, token
+        )
+
+    def follow(self):
+        if not self.ensure_login():
+            return
+        username = self.random.choice(self.data['users'])
+        self.request('follow', 'GET', f'/profile/{username}/follow/')
+        self.request('unfollow', 'GET', f'/profile/{username}/unfollow/')
+
+
+class Results:
+    """Замеры одного воркера."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+        self.exceptions = Counter()
+
+    def record(self, label, duration, status, error=None):
+        self.timings[label].append(duration)
+        if error is not None:
+            self.errors[(label, error)] += 1
+        elif status >= 500:
+            self.errors[(label, str(status))] += 1
+
+    def merge(self, other):
+        for label, values in other.timings.items():
+            self.timings[label].extend(values)
+        self.errors.update(other.errors)
+        self.exceptions.update(other.exceptions)
+        return self
+
+
+def make_transport(address):
+    """Транспорт по адресу (host, port) или в том же процессе для None."""
+    if address is not None:
+        return HttpTransport(*address)
+    from yatube.wsgi import application
+    return InProcessTransport(application)
+
+
+def parse_mix(value):
+    """Разбирает пропорцию сценариев вида 'browse=70,login=5'."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('Все веса сценариев нулевые')
+    return mix
+
+
+def sample_data(password, limit=1000):
+    """Адреса, по которым будут ходить виртуальные пользователи."""
+    return {
+        'posts': list(
+            Post.objects.order_by('-pub_date')
+            .values_list('pk', flat=True)[:limit]
+        ),
+        'groups': list(Group.objects.values_list('slug', flat=True)[:limit]),
+        'users': list(
+            User.objects.filter(is_active=True)
+            .values_list('username', flat=True)[:limit]
+        ),
+        'password': password,
+    }
+
+
+def run_worker(address, data, mix, duration, users, seed):
+    """
+    Запускает users виртуальных пользователей последовательно по кругу
+    в течение duration секунд. Выполняется в потоке или процессе пула.
+    """
+    results = Results()
+    rng = random.Random(seed)
+    transport = make_transport(address)
+    clients = [
+        VirtualUser(transport, data, results, rng) for _ in range(users)
+    ]
+    scenarios, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+    try:
+        while time.monotonic() < deadline:
+            for client in clients:
+                (scenario,) = rng.choices(scenarios, weights)
+                getattr(client, scenario)()
+    finally:
+        connections.close_all()
+    return results
+
+
+def run_threads(address, data, mix, duration, threads, users, seed):
+    """
+    Потоки нагрузки одного процесса. Сигнал об исключении не знает,
+    в каком потоке оно случилось, поэтому обработчик подключается один
+    раз на все потоки и отключается по завершении прогона.
+    """
+    exceptions = Counter()
+    lock = threading.Lock()
+
+    def on_exception(sender, request=None, **kwargs):
+        error = sys.exc_info()[1]
+        with lock:
+            exceptions[str(error) or type(error).__name__] += 1
+
+    got_request_exception.connect(
+        on_exception, weak=False, dispatch_uid=EXCEPTION_RECEIVER_UID
+    )
+    results = Results()
+    try:
+        with ThreadPoolExecutor(threads) as executor:
+            futures = [
+                executor.submit(
+                    run_worker, address, data, mix, duration, users,
+                    seed + number
+                )
+                for number in range(threads)
+            ]
+            for future in futures:
+                results.merge(future.result())
+    finally:
+        got_request_exception.disconnect(dispatch_uid=EXCEPTION_RECEIVER_UID)
+    results.exceptions.update(exceptions)
+    return results
+
+
+def run(address, data, mix, duration, threads=1, processes=1, users=1,
+        seed=0):
+    """
+    Нагрузка из processes процессов по threads потоков, в каждом потоке
+    users виртуальных пользователей. Возвращает результаты и длительность.
+    """
+    started = time.monotonic()
+    if processes == 1:
+        results = run_threads(
+            address, data, mix, duration, threads, users, seed
+        )
+    else:
+        # Соединения с базой нельзя делить между процессами
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes) as pool:
+            parts = pool.starmap(run_threads, [
+                (address, data, mix, duration, threads, users,
+                 seed + number * threads)
+                for number in range(processes)
+            ])
+        results = Results()
+        for part in parts:
+            results.merge(part)
+    return results, time.monotonic() - started
+
+
+def report(results, elapsed):
+    """Строки отчёта: пропускная способность, перцентили и ошибки."""
+    total = sum(len(values) for values in results.timings.values())
+    errors = sum(results.errors.values())
+    lines = [
+        f'Запросов: {total} за {elapsed:.1f} с, '
+        f'{total / elapsed:.1f} запросов/с, '
+        f'ошибок: {errors} ({errors / total * 100 if total else 0:.2f}%)',
+        f"{'запрос':<18}{'кол-во':>8}{'p50, ms':>10}{'p95, ms':>10}"
+        f"{'p99, ms':>10}{'ошибок':>8}",
+    ]
+    for label in sorted(results.timings):
+        stats = summarize(results.timings[label])
+        label_errors = sum(
+            count for (name, _), count in results.errors.items()
+            if name == label
+        )
+        lines.append(
+            f'{label:<18}{stats["count"]:>8}{stats["p50"] * 1000:>10.1f}'
+            f'{stats["p95"] * 1000:>10.1f}{stats["p99"] * 1000:>10.1f}'
+            f'{label_errors:>8}'
+        )
+    for (label, error), count in results.errors.most_common():
+        lines.append(f'ошибка {label}: {error} x{count}')
+    for error, count in results.exceptions.most_common():
+        lines.append(f'исключение: {error} x{count}')
+    return lines
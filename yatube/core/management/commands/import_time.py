@@ -0,0 +1,51 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчёт о времени импорта модулей при холодном старте воркера '
+        '(python -X importtime).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'module', nargs='?',
+            default=os.environ.get('DJANGO_SETTINGS_MODULE'),
+            help='Модуль настроек, по умолчанию текущий.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько самых медленных модулей вывести.'
+        )
+        parser.add_argument(
+            '--packages', action='store_true',
+            help='Суммировать время по пакетам верхнего уровня.'
+        )
+
+    def handle(self, *args, **options):
+        modules = startup.import_times(options['module'])
+        total = sum(own for _, own, _, _ in modules)
+        self.stdout.write(
+            f"{options['module']}: {len(modules)} модулей, "
+            f'импорт {total / 1000:.1f} ms'
+        )
+        if options['packages']:
+            self.stdout.write(f"{'пакет':<40}{'ms':>10}{'%':>8}")
+            for package, own in startup.top_level_packages(modules)[
+                :options['limit']
+            ]:
+                self.stdout.write(
+                    f'{package:<40}{own / 1000:>10.1f}'
+                    f'{own / total * 100:>8.1f}'
+                )
+            return
+        self.stdout.write(f"{'модуль':<50}{'self, ms':>10}{'total, ms':>11}")
+        slowest = sorted(modules, key=lambda module: -module[1])
+        for name, own, cumulative, _ in slowest[:options['limit']]:
+            self.stdout.write(
+                f'{name:<50}{own / 1000:>10.1f}{cumulative / 1000:>11.1f}'
+            )
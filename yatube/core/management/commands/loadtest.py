@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест смешанным потоком запросов: просмотр лент, вход, '
+        'публикация постов, комментарии, подписки. Выводит пропускную '
+        'способность, перцентили времени ответа и долю ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host', default=None,
+            help='Адрес запущенного сервера; без него запросы идут '
+                 'в yatube.wsgi.application в этом же процессе.'
+        )
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument(
+            '--users', type=int, default=1,
+            help='Виртуальных пользователей на поток.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность теста в секундах.'
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(
+                f'{name}={weight}'
+                for name, weight in loadtest.DEFAULT_MIX.items()
+            ),
+            help='Веса сценариев: browse, login, create, comment, follow.'
+        )
+        parser.add_argument(
+            '--password', default='yatube',
+            help='Пароль пользователей (как в generate_data).'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        data = loadtest.sample_data(options['password'])
+        if not data['posts'] or not data['users']:
+            raise CommandError(
+                'База пуста, сначала выполните manage.py generate_data'
+            )
+        address = None
+        if options['host']:
+            address = (options['host'], options['port'])
+        # Панель отладки не должна влиять на замеры
+        with override_settings(DEBUG=False):
+            results, elapsed = loadtest.run(
+                address, data, mix, options['duration'],
+                threads=options['threads'],
+                processes=options['processes'],
+                users=options['users'],
+                seed=options['seed'],
+            )
+        for line in loadtest.report(results, elapsed):
+            self.stdout.write(line)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт подписанный токен для профилирования запроса: '
+        '?_profile=<токен> или заголовок X-Profile-Token.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--uses', type=int, default=1,
+            help='На сколько запросов действует токен.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token(options['uses']))
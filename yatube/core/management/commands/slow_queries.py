@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import summarize
+
+
+class Command(BaseCommand):
+    help = 'Сводка медленных запросов по отпечаткам, по суммарному времени.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERY_LOG,
+            help='Файл журнала медленных запросов.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько отпечатков вывести.'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать план выполнения для каждого отпечатка.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            summary = summarize(options['log'])
+        except FileNotFoundError:
+            raise CommandError(f"Журнал {options['log']} не найден")
+        for number, item in enumerate(summary[:options['limit']], 1):
+            self.stdout.write(
+                f"{number}. total={item['total_ms']:.1f}ms "
+                f"count={item['count']} "
+                f"avg={item['total_ms'] / item['count']:.1f}ms "
+                f"max={item['max_ms']:.1f}ms "
+                f"views={','.join(sorted(item['views'])) or '-'}"
+            )
+            self.stdout.write(f"   {item['fingerprint']}")
+            if options['plans'] and item['plan']:
+                for row in item['plan']:
+                    self.stdout.write(f'     {row}')
@@ -0,0 +1,40 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import startup
+from core.benchmark import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время холодного старта воркера для модулей настроек: '
+        'импорт WSGI-приложения и загрузку urlconf в новом процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'modules', nargs='*',
+            default=[
+                os.environ.get('DJANGO_SETTINGS_MODULE'),
+                'yatube.settings_production',
+            ],
+            help='Модули настроек для сравнения.'
+        )
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'настройки':<32}{'p50, ms':>10}{'p95, ms':>10}{'mean, ms':>10}"
+        )
+        baseline = None
+        for module in options['modules']:
+            stats = summarize(
+                [startup.boot_time(module) for _ in range(options['runs'])]
+            )
+            baseline = baseline or stats['p50']
+            self.stdout.write(
+                f'{module:<32}{stats["p50"] * 1000:>10.1f}'
+                f'{stats["p95"] * 1000:>10.1f}{stats["mean"] * 1000:>10.1f}'
+                f'{(stats["p50"] / baseline - 1) * 100:>+8.0f}%'
+            )
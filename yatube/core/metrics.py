@@ -0,0 +1,254 @@
+"""
+Счётчики и гистограммы для локального endpoint-а метрик.
+
+Каждый процесс копит значения в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает снимок в свой файл в METRICS_DIR.
+При запросе метрик снимки всех процессов складываются, поэтому видна
+картина по всем воркерам; снимки завершившихся процессов удаляются.
+Вывод - в текстовом формате Prometheus.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Границы корзин гистограмм, в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PREFIX = 'yatube_'
+
+
+class Registry:
+    """Метрики текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        # (имя, метки) -> значение
+        self.counters = defaultdict(float)
+        # (имя, метки) -> {'buckets': [...], 'sum': ..., 'count': ...};
+        # последняя корзина - значения больше всех границ BUCKETS
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def _check_fork(self):
+        """Дочерний процесс не должен повторно учитывать значения родителя."""
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self._check_fork()
+            self.counters[(name, labels)] += amount
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            self._check_fork()
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = new_histogram()
+                self.histograms[(name, labels)] = histogram
+            histogram['buckets'][bisect.bisect_left(BUCKETS, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, list(labels),
+                     dict(values, buckets=list(values['buckets']))]
+                    for (name, labels), values in self.histograms.items()
+                ],
+            }
+
+    def flush(self):
+        directory = metrics_dir()
+        os.makedirs(directory, 0o700, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp_path, path)
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+
+registry = Registry()
+
+
+def new_histogram():
+    return {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0, 'count': 0}
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def metrics_dir():
+    return settings.METRICS_DIR
+
+
+def labels(**values):
+    return tuple(sorted(values.items()))
+
+
+def observe_request(metrics, status):
+    """Учитывает показатели завершённого запроса."""
+    view = labels(view=metrics.view_name or 'unmatched')
+    registry.inc(
+        'http_requests_total',
+        labels(view=metrics.view_name or 'unmatched', status=str(status))
+    )
+    registry.observe('http_request_duration_seconds', view, metrics.elapsed)
+    registry.observe('db_duration_seconds', view, metrics.db_time)
+    registry.inc('db_queries_total', view, metrics.db_count)
+    registry.inc('cache_hits_total', view, metrics.cache_hits)
+    registry.inc('cache_misses_total', view, metrics.cache_misses)
+    registry.maybe_flush()
+
+
+def collect():
+    """Складывает снимки всех процессов."""
+    registry.flush()
+    counters = defaultdict(float)
+    histograms = {}
+    directory = metrics_dir()
+    for filename in os.listdir(directory):
+        pid, extension = os.path.splitext(filename)
+        if extension != '.json':
+            continue
+        path = os.path.join(directory, filename)
+        if pid.isdigit() and not process_alive(int(pid)):
+            # Иначе значения перезапущенных воркеров суммировались бы вечно
+            remove_snapshot(path)
+            continue
+        try:
+            with open(path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, pairs, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, pairs)))] += value
+        for name, pairs, values in snapshot['histograms']:
+            key = (name, tuple(map(tuple, pairs)))
+            total = histograms.setdefault(key, new_histogram())
+            for index, count in enumerate(values['buckets']):
+                total['buckets'][index] += count
+            total['sum'] += values['sum']
+            total['count'] += values['count']
+    return counters, histograms
+
+
+def remove_snapshot(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def format_labels(pairs, **extra):
+    pairs = list(pairs) + sorted(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_counters(counters):
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {PREFIX}{name} counter')
+        for (metric, pairs), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(
+                    f'{PREFIX}{name}{format_labels(pairs)} '
+                    f'{format_number(value)}'
+                )
+    return lines
+
+
+def render_hit_ratio(counters):
+    lines = [f'# TYPE {PREFIX}cache_hit_ratio gauge']
+    for (metric, pairs), hits in sorted(counters.items()):
+        if metric != 'cache_hits_total':
+            continue
+        total = hits + counters.get(('cache_misses_total', pairs), 0)
+        if total:
+            lines.append(
+                f'{PREFIX}cache_hit_ratio{format_labels(pairs)} '
+                f'{format_number(round(hits / total, 4))}'
+            )
+    return lines
+
+
+def render_histogram(name, pairs, values):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS, values['buckets']):
+        cumulative += count
+        lines.append(
+            f'{PREFIX}{name}_bucket'
+            f'{format_labels(pairs, le=bound)} {cumulative}'
+        )
+    # +Inf включает и значения больше последней границы
+    lines.append(
+        f'{PREFIX}{name}_bucket'
+        f'{format_labels(pairs, le="+Inf")} {values["count"]}'
+    )
+    lines.append(
+        f'{PREFIX}{name}_sum{format_labels(pairs)} '
+        f'{format_number(values["sum"])}'
+    )
+    lines.append(
+        f'{PREFIX}{name}_count{format_labels(pairs)} '
+        f'{format_number(values["count"])}'
+    )
+    return lines
+
+
+def render():
+    """Текстовое представление метрик в формате Prometheus."""
+    counters, histograms = collect()
+    lines = render_counters(counters) + render_hit_ratio(counters)
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {PREFIX}{name} histogram')
+        for (metric, pairs), values in sorted(histograms.items()):
+            if metric == name:
+                lines.extend(render_histogram(name, pairs, values))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,107 @@
+import threading
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .. import instrumentation
+
+# Ожидающий запрос получил копию ответа ведущего, не дойдя до
+# представления: для учёта того, что представление делает при каждом
+# запросе (например, счётчика просмотров). match - разбор его адреса
+response_shared = Signal(providing_args=['request', 'match'])
+
+
+class Flight:
+    """Запрос, который сейчас обрабатывает ведущий поток."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class RequestCoalescingMiddleware:
+    """
+    Объединяет одинаковые одновременные GET-запросы анонимных пользователей.
+
+    Первый запрос (ведущий) рендерит страницу, остальные ждут его не дольше
+    COALESCE_TIMEOUT секунд и получают копию ответа. Если ожидание истекло
+    или ответ нельзя раздавать другим, запрос обрабатывается сам.
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def __call__(self, request):
+        match = self.coalescable_match(request)
+        if match is None:
+            return self.get_response(request)
+        key = request.get_full_path()
+        with self.lock:
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = Flight()
+        if leader:
+            return self.lead(request, key, flight)
+        if flight.done.wait(settings.COALESCE_TIMEOUT):
+            if flight.response is not None:
+                # process_view не вызывался: метрики запроса иначе
+                # попали бы в unmatched
+                metrics = instrumentation.current()
+                if metrics is not None:
+                    metrics.view_name = match.view_name
+                response_shared.send(
+                    sender=self.__class__, request=request, match=match
+                )
+                return self.copy_response(flight.response)
+        return self.get_response(request)
+
+    def lead(self, request, key, flight):
+        try:
+            response = self.get_response(request)
+            if self.is_shareable(request, response):
+                flight.response = response
+            return response
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight.done.set()
+
+    @staticmethod
+    def coalescable_match(request):
+        """Разбор адреса запроса, если его можно объединять, иначе None."""
+        if request.method != 'GET' or request.user.is_authenticated:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in settings.COALESCE_URL_NAMES:
+            return None
+        return match
+
+    @staticmethod
+    def is_shareable(request, response):
+        """Чужие cookie и CSRF-токен ведущего не должны попасть к другим."""
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    @staticmethod
+    def copy_response(response):
+        """Новый объект ответа, чтобы middleware не меняли общий."""
+        copy = HttpResponse(
+            response.content,
+            status=response.status_code,
+        )
+        for header, value in response.items():
+            copy[header] = value
+        return copy
@@ -0,0 +1,38 @@
+import random
+
+from django.conf import settings
+
+from core import profiling
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует выборку запросов и запросы с подписанным токеном.
+    Подробности - в core.profiling.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = profiling.make_profiler()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        match = getattr(request, 'resolver_match', None)
+        profiling.save(profiler, match.view_name if match else None)
+        return response
+
+    @staticmethod
+    def should_profile(request):
+        token = (
+            request.GET.get('_profile')
+            or request.META.get('HTTP_X_PROFILE_TOKEN')
+        )
+        if token:
+            return profiling.check_token(token)
+        return random.random() < settings.PROFILE_SAMPLE_RATE
@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from core import instrumentation, metrics as metrics_registry
+
+logger = logging.getLogger('yatube.performance')
+
+
+@contextmanager
+def timed_queries():
+    """Подключает query_timer ко всем соединениям на время запроса."""
+    wrapped = list(connections.all())
+    for connection in wrapped:
+        connection.execute_wrappers.append(instrumentation.query_timer)
+    try:
+        yield
+    finally:
+        for connection in wrapped:
+            # Не pop(): переоткрытое за время запроса соединение добавляет
+            # свои обёртки (core.slow_queries.install) в конец списка
+            connection.execute_wrappers.remove(instrumentation.query_timer)
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время запроса, работы с базой, рендеринга шаблонов и
+    обращения к кэшу. Результат отдаётся в заголовке Server-Timing и
+    пишется в лог одной строкой JSON.
+    Заголовок и лог формируются только для доли запросов PERF_SAMPLE_RATE,
+    в метрики при METRICS_ENABLED попадает каждый запрос.
+    Должен стоять первым в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PERF_SAMPLE_RATE
+        if not sampled and not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = instrumentation.start()
+        try:
+            with timed_queries():
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        if settings.METRICS_ENABLED:
+            metrics_registry.observe_request(metrics, response.status_code)
+        if not sampled:
+            return response
+        response['Server-Timing'] = self.server_timing(metrics)
+        data = metrics.as_dict()
+        data.update(
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+        )
+        logger.info(json.dumps(data, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = instrumentation.current()
+        if metrics is not None:
+            metrics.view_name = request.resolver_match.view_name
+
+    @staticmethod
+    def server_timing(metrics):
+        return ', '.join((
+            f'total;dur={metrics.elapsed * 1000:.2f}',
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.db_count} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.2f}',
+            f'cache;desc="hits={metrics.cache_hits} '
+            f'misses={metrics.cache_misses}"',
+        ))
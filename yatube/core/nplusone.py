@@ -0,0 +1,115 @@
+"""
+Обнаружение N+1 запросов при ленивой загрузке внешних ключей.
+
+Объекты, полученные одним запросом, помечаются общей меткой. Если для
+двух объектов с одной меткой лениво загружается одно и то же поле
+ForeignKey (например, post.author в цикле шаблона без select_related),
+выдаётся предупреждение NPlusOneWarning или исключение NPlusOneError -
+в зависимости от NPLUSONE_DETECTION ('warn' или 'raise'). В сообщении
+указаны представление и строка шаблона, вызвавшие загрузку.
+
+Включается в CoreConfig.ready(), только для разработки и тестов.
+"""
+import sys
+import warnings
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor
+)
+from django.db.models.query import ModelIterable
+from django.http import HttpRequest
+from django.template.base import Node
+
+from core import instrumentation
+
+PEERS_ATTRIBUTE = '_nplusone_peers'
+
+
+class NPlusOneWarning(RuntimeWarning):
+    pass
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class Peers:
+    """Общая метка объектов одного запроса и счётчик ленивых загрузок."""
+
+    def __init__(self):
+        self.loads = Counter()
+
+
+_original_iter = ModelIterable.__iter__
+_original_get_object = ForwardManyToOneDescriptor.get_object
+
+
+def _tagged_iter(self):
+    peers = Peers()
+    for obj in _original_iter(self):
+        setattr(obj, PEERS_ATTRIBUTE, peers)
+        yield obj
+
+
+def _detecting_get_object(self, instance):
+    peers = getattr(instance, PEERS_ATTRIBUTE, None)
+    if peers is not None:
+        peers.loads[self.field.name] += 1
+        if peers.loads[self.field.name] == 2:
+            report(instance, self.field.name)
+    return _original_get_object(self, instance)
+
+
+def install():
+    ModelIterable.__iter__ = _tagged_iter
+    ForwardManyToOneDescriptor.get_object = _detecting_get_object
+
+
+def uninstall():
+    ModelIterable.__iter__ = _original_iter
+    ForwardManyToOneDescriptor.get_object = _original_get_object
+
+
+def template_location(frame):
+    """Шаблон и строка ближайшего рендерящегося узла шаблона."""
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and getattr(node, 'token', None):
+            origin = getattr(node, 'origin', None)
+            name = getattr(origin, 'template_name', None) or '<string>'
+            return f'{name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def view_name(frame):
+    """Имя представления из показателей запроса или из стека вызовов."""
+    metrics = instrumentation.current()
+    if metrics is not None and metrics.view_name:
+        return metrics.view_name
+    while frame is not None:
+        for value in frame.f_locals.values():
+            match = getattr(value, 'resolver_match', None)
+            if isinstance(value, HttpRequest) and match is not None:
+                return match.view_name
+        frame = frame.f_back
+    return None
+
+
+def report(instance, field_name):
+    mode = settings.NPLUSONE_DETECTION
+    if not mode:
+        return
+    frame = sys._getframe(2)
+    message = (
+        f'N+1: поле {type(instance).__name__}.{field_name} загружается '
+        f'лениво для нескольких объектов одного запроса; '
+        f'представление {view_name(frame) or "-"}, '
+        f'шаблон {template_location(frame) or "-"}. '
+        f'Добавьте select_related({field_name!r}).'
+    )
+    if mode == 'raise':
+        raise NPlusOneError(message)
+    warnings.warn(message, NPlusOneWarning, stacklevel=3)
@@ -0,0 +1,150 @@
+"""
+Профилирование отдельных запросов в рабочем окружении.
+
+Профилируется доля запросов PROFILE_SAMPLE_RATE, а также любой запрос с
+подписанным токеном в параметре ?_profile= или заголовке X-Profile-Token
+(токен выдаёт manage.py profile_token). Токен действует на заданное при
+выдаче число запросов (по умолчанию один): использования отмечаются в
+общем кэше, так что перехваченный токен нельзя проигрывать. Результаты
+складываются в PROFILE_DIR/<имя представления>/, где хранятся только
+последние PROFILE_MAX_FILES файлов:
+  * sampler - семплер стеков, файл .collapsed в формате flamegraph.pl
+    и speedscope;
+  * cprofile - cProfile, файл .prof для snakeviz/flameprof.
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+TOKEN_SALT = 'core.profiling'
+
+
+def make_token(uses=1):
+    return signing.dumps(
+        {'nonce': uuid.uuid4().hex, 'uses': uses}, salt=TOKEN_SALT
+    )
+
+
+def check_token(token):
+    """Проверяет подпись и тратит одно использование токена."""
+    try:
+        data = signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    if not isinstance(data, dict) or 'nonce' not in data:
+        return False
+    # add атомарен: каждое использование достаётся одному запросу
+    for use in range(data.get('uses', 1)):
+        if cache.add(
+                f'profile:token:{data["nonce"]}:{use}', True,
+                settings.PROFILE_TOKEN_MAX_AGE):
+            return True
+    return False
+
+
+class StackSampler:
+    """Периодически снимает стек потока, обрабатывающего запрос."""
+
+    suffix = '.collapsed'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get('__name__', '?')
+            names.append(f'{module}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class DeterministicProfiler:
+    """Обёртка над cProfile с тем же интерфейсом, что у StackSampler."""
+
+    suffix = '.prof'
+
+    def __init__(self, interval):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {
+    'sampler': StackSampler,
+    'cprofile': DeterministicProfiler,
+}
+
+
+def make_profiler():
+    return PROFILERS[settings.PROFILER](settings.PROFILE_INTERVAL)
+
+
+def save(profiler, view_name):
+    """Сохраняет результат в каталог представления, возвращает путь."""
+    directory = os.path.join(
+        settings.PROFILE_DIR, (view_name or 'unmatched').replace(':', '.')
+    )
+    os.makedirs(directory, exist_ok=True)
+    filename = (
+        f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+        f'{time.monotonic_ns()}{profiler.suffix}'
+    )
+    path = os.path.join(directory, filename)
+    profiler.dump(path)
+    prune(directory)
+    return path
+
+
+def prune(directory):
+    """Оставляет в каталоге последние PROFILE_MAX_FILES файлов."""
+    paths = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory)),
+        key=os.path.getmtime
+    )
+    for path in paths[:-settings.PROFILE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,168 @@
+"""
+Рассылка событий подписчикам внутри процесса с мостом между воркерами.
+
+Событие публикуется строкой JSON в общий журнал (файл с дозаписью).
+В каждом процессе один фоновый поток читает новые строки журнала и
+раскладывает события по очередям подписчиков своих каналов, поэтому
+подписчик получает события всех воркеров машины, а процессы ничего не
+знают друг о друге. Дозапись и ротация журнала синхронизируются через
+flock. Подписчик получает события, опубликованные после подписки.
+"""
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Сколько событий хранить в очереди подписчика, который не успевает читать
+QUEUE_SIZE: int = 1000
+
+
+class Subscription:
+    """Очередь событий выбранных каналов: (канал, событие, данные)."""
+
+    def __init__(self, broadcaster, channels):
+        self.broadcaster = broadcaster
+        self.channels = frozenset(channels)
+        self.queue = queue.Queue(QUEUE_SIZE)
+
+    def get(self, timeout=None):
+        """Следующее событие; None, если за timeout секунд его не было."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Broadcaster:
+    """Подписки процесса на каналы журнала path."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, 0o700, exist_ok=True)
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+        self.reader = None
+
+    def publish(self, channels, event, data):
+        line = json.dumps(
+            {'channels': list(channels), 'event': event, 'data': data}
+        ) + '\n'
+        with self.locked_log() as file:
+            size = os.fstat(file.fileno()).st_size
+            if size > settings.LIVE_EVENTS_MAX_SIZE:
+                # Читатели заметят новый файл, дочитав старый
+                os.replace(self.path, self.path + '.1')
+                with open(self.path, 'a') as new_file:
+                    new_file.write(line)
+            else:
+                file.write(line)
+
+    def locked_log(self):
+        """Текущий (не ротированный) журнал, открытый на дозапись под flock."""
+        while True:
+            file = open(self.path, 'a')
+            fcntl.flock(file, fcntl.LOCK_EX)
+            if not self.rotated(file):
+                return file
+            file.close()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions[channel].add(subscription)
+            if self.reader is None or not self.reader.is_alive():
+                # Журнал открывается сразу: события, опубликованные после
+                # возврата из subscribe, дойдут до подписчика
+                self.reader = threading.Thread(
+                    target=self.read, args=(self.open_log(os.SEEK_END),),
+                    name='pubsub-reader', daemon=True
+                )
+                self.reader.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions[channel].discard(subscription)
+                if not self.subscriptions[channel]:
+                    del self.subscriptions[channel]
+
+    def dispatch(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        with self.lock:
+            for channel in message['channels']:
+                for subscription in self.subscriptions.get(channel, ()):
+                    try:
+                        subscription.queue.put_nowait(
+                            (channel, message['event'], message['data'])
+                        )
+                    except queue.Full:
+                        pass
+
+    def open_log(self, position):
+        open(self.path, 'a').close()
+        file = open(self.path)
+        file.seek(0, position)
+        return file
+
+    def read(self, file):
+        """Поток чтения: дочитывает журнал, пока есть подписчики."""
+        buffer = ''
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    self.reader = None
+                    break
+            chunk = file.read()
+            if chunk:
+                buffer += chunk
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    self.dispatch(line)
+                continue
+            if self.rotated(file):
+                file.close()
+                file = self.open_log(os.SEEK_SET)
+                continue
+            time.sleep(settings.LIVE_POLL_INTERVAL)
+        file.close()
+
+    def rotated(self, file):
+        """Файл журнала по пути path уже другой."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(path=None):
+    """Общий для процесса Broadcaster журнала (LIVE_EVENTS_FILE)."""
+    path = path or settings.LIVE_EVENTS_FILE
+    with _broadcasters_lock:
+        if path not in _broadcasters:
+            _broadcasters[path] = Broadcaster(path)
+        return _broadcasters[path]
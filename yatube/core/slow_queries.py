@@ -0,0 +1,134 @@
+"""
+Журнал медленных SQL-запросов.
+
+Запросы дольше SLOW_QUERY_THRESHOLD секунд пишутся в лог и строкой JSON в
+файл SLOW_QUERY_LOG вместе с планом выполнения (EXPLAIN QUERY PLAN),
+именем представления и «отпечатком» - текстом запроса без литералов.
+Сводку по отпечаткам выводит команда manage.py slow_queries.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import instrumentation
+
+logger = logging.getLogger('yatube.slow_queries')
+
+_local = threading.local()
+
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """Текст запроса без литералов и параметров."""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def explain(connection, sql, params):
+    """
+    План выполнения запроса или None, если его не удалось получить.
+    Курсор берётся в обход обёрток и журнала запросов соединения, чтобы
+    EXPLAIN не засчитывался запросам приложения.
+    """
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    try:
+        connection.ensure_connection()
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception:
+        return None
+
+
+def slow_query_logger(execute, sql, params, many, context):
+    """execute_wrapper, записывающий медленные запросы."""
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None or getattr(_local, 'active', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration >= threshold:
+            _local.active = True
+            try:
+                record(context['connection'], sql, params, many, duration)
+            finally:
+                _local.active = False
+
+
+def record(connection, sql, params, many, duration):
+    metrics = instrumentation.current()
+    plan = None
+    if not many and sql.lstrip().upper().startswith('SELECT'):
+        plan = explain(connection, sql, params)
+    entry = {
+        'time': timezone.now().isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'view': metrics.view_name if metrics else None,
+        'fingerprint': fingerprint(sql),
+        'sql': sql,
+        'plan': plan,
+    }
+    line = json.dumps(entry, ensure_ascii=False)
+    logger.warning(line)
+    path = settings.SLOW_QUERY_LOG
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+
+
+def install(sender, connection, **kwargs):
+    """Подключает журнал к каждому новому соединению с базой."""
+    if slow_query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_logger)
+
+
+def summarize(path):
+    """Сводка по отпечаткам, отсортированная по суммарному времени."""
+    summary = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            item = summary.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': set(),
+                'plan': entry.get('plan'),
+            })
+            item['count'] += 1
+            item['total_ms'] += entry['duration_ms']
+            item['max_ms'] = max(item['max_ms'], entry['duration_ms'])
+            if entry.get('view'):
+                item['views'].add(entry['view'])
+    return sorted(
+        summary.values(), key=lambda item: item['total_ms'], reverse=True
+    )
@@ -0,0 +1,72 @@
+"""
+Замеры холодного старта воркера.
+
+Каждый замер - отдельный процесс интерпретатора с заданным модулем
+настроек: импорт yatube.wsgi.application и загрузка корневого urlconf,
+то есть всё, что воркер делает до обработки первого запроса.
+"""
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+BOOT_CODE = '''
+import time
+started = time.perf_counter()
+from yatube.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - started)
+'''
+
+# Строка вывода python -X importtime:
+# import time: self [us] | cumulative | imported package
+IMPORT_TIME_LINE = re.compile(
+    r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$'
+)
+
+
+def run_boot(settings_module, importtime=False):
+    """Запускает холодный старт в новом процессе, возвращает его вывод."""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', BOOT_CODE]
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    return subprocess.run(
+        command, cwd=settings.BASE_DIR, env=environment,
+        capture_output=True, text=True, check=True,
+    )
+
+
+def boot_time(settings_module):
+    """Время холодного старта в секундах."""
+    return float(run_boot(settings_module).stdout.split()[-1])
+
+
+def import_times(settings_module):
+    """
+    Время импорта модулей при старте: список (модуль, собственное время,
+    время с вложенными импортами, глубина вложенности), в микросекундах.
+    """
+    stderr = run_boot(settings_module, importtime=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append(
+                (name, int(own), int(cumulative), (len(indent) - 1) // 2)
+            )
+    return modules
+
+
+def top_level_packages(modules):
+    """Суммарное собственное время импорта по пакетам верхнего уровня."""
+    packages = {}
+    for name, own, _, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + own
+    return sorted(packages.items(), key=lambda item: -item[1])
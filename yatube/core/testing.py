@@ -0,0 +1,173 @@
+"""Вспомогательные средства для тестов."""
+import copy
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class IsolatedTestRunner(DiscoverRunner):
+    """
+    Запускает тесты со своими файлами общего кэша и прочего во временном
+    каталоге, чтобы они не видели состояние сервера разработки и
+    предыдущих или параллельных запусков.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directory = tempfile.mkdtemp(prefix='yatube-test-')
+        caches = copy.deepcopy(settings.CACHES)
+        caches['shared']['LOCATION'] = self.path('yatube.cache')
+        self.isolated = override_settings(
+            CACHES=caches,
+            COMMENT_JOURNAL_DIR=self.path('journal'),
+            LIVE_EVENTS_FILE=self.path('yatube.events'),
+            PROFILE_DIR=self.path('profiles'),
+            METRICS_DIR=self.path('metrics'),
+        )
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+
+# Размеры данных, на которых проверяется рост числа запросов
+QUERY_BUDGET_SIZES = (1, 5, 20)
+
+
+class QueryBudgetMixin:
+    """
+    Проверка бюджета запросов к базе для представлений (QUERY_BUDGETS).
+    Представление рендерится на всё большем объёме данных: число запросов
+    не должно расти вместе с ним и не должно превышать бюджет.
+    """
+
+    def assertQueryBudget(self, url_name, grow, client=None, kwargs=None,
+                          sizes=QUERY_BUDGET_SIZES):
+        """
+        grow(size) должна довести объём данных на странице до size
+        (постов в ленте, комментариев к посту и т.п.).
+        """
+        budget = settings.QUERY_BUDGETS[url_name]
+        client = client or self.client
+        url = reverse(url_name, kwargs=kwargs)
+        counts = {}
+        # Все объекты должны помещаться на одну страницу
+        with override_settings(POSTS_LIMIT=max(sizes)):
+            for size in sizes:
+                grow(size)
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                counts[size] = len(context.captured_queries)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Число запросов {url_name} растёт с объёмом данных: {counts}'
+        )
+        self.assertLessEqual(
+            counts[sizes[-1]], budget,
+            f'{url_name}: {counts[sizes[-1]]} запросов при бюджете {budget}'
+        )
+
+
+class QueryPlanMixin:
+    """
+    Проверка планов выполнения запросов представления на SQLite:
+    запросы с сортировкой должны читать таблицу по ожидаемому индексу
+    (или одному из нескольких), без полного просмотра и, если не задано
+    sort=True, без сортировки во временном B-дереве.
+    """
+
+    @staticmethod
+    def explain(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            # Старые версии SQLite пишут «SCAN TABLE имя», новые - «SCAN имя»
+            return [
+                row[-1].replace(' TABLE ', ' ', 1)
+                for row in cursor.fetchall()
+            ]
+
+    def assertViewQueryPlan(self, url, table, index, client=None,
+                            sort=False):
+        client = client or self.client
+        indexes = (index,) if isinstance(index, str) else index
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if f'FROM "{table}"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(queries, f'{url}: нет запросов к {table}')
+        for sql in queries:
+            plan = self.explain(sql)
+            details = '\n'.join(plan)
+            self.assertTrue(
+                any(
+                    line.split()[1] == table
+                    and any(f'INDEX {name} ' in f'{line} ' for name in indexes)
+                    for line in plan if line.startswith(('SCAN', 'SEARCH'))
+                ),
+                f'{url}: {table} читается не по индексу {index}:\n{details}'
+            )
+            if not sort:
+                self.assertNotIn(
+                    'TEMP B-TREE', details,
+                    f'{url}: запросу нужна сортировка:\n{details}'
+                )
+            for line in plan:
+                self.assertFalse(
+                    line.startswith('SCAN') and 'USING' not in line,
+                    f'{url}: полный просмотр таблицы:\n{details}'
+                )
+
+
+class MemoryBudgetMixin:
+    """
+    Проверка пикового объёма памяти, выделяемой при рендеринге страницы
+    (MEMORY_BUDGETS), по данным tracemalloc. Регрессии в шаблонах и
+    запросах, из-за которых страница держит в памяти лишнее, роняют тест.
+    """
+
+    def measure_peak_memory(self, url, client=None):
+        """Пик выделенной памяти в байтах за один запрос к url."""
+        client = client or self.client
+        # Первый запрос загружает модули и компилирует шаблоны
+        client.get(url)
+        cache.clear()
+        tracemalloc.start()
+        try:
+            response = client.get(url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        return peak
+
+    def assertMemoryBudget(self, url_name, client=None, kwargs=None):
+        budget = settings.MEMORY_BUDGETS[url_name]
+        peak = self.measure_peak_memory(
+            reverse(url_name, kwargs=kwargs), client
+        )
+        self.assertLessEqual(
+            peak, budget,
+            f'{url_name}: пик памяти {peak / 2 ** 20:.1f} МиБ '
+            f'при бюджете {budget / 2 ** 20:.1f} МиБ'
+        )
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from ..cache_backends.mmapped import MmapCache
+
+
+def increment_counter(location, times):
+    """Увеличивает счётчик из отдельного процесса."""
+    cache = MmapCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class MmapCacheTests(SimpleTestCase):
+    """Тесты для кэша в memory-mapped файле."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'test.cache')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return MmapCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'value': [1, 2, 3]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2, 3]})
+        self.assertTrue(self.cache.has_key('key'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_overwrite_and_add(self):
+        """set перезаписывает значение, add - нет."""
+        self.cache.set('key', 'first')
+        self.cache.set('key', 'second')
+        self.assertFalse(self.cache.add('key', 'third'))
+        self.assertEqual(self.cache.get('key'), 'second')
+        self.assertTrue(self.cache.add('other', 'value'))
+
+    def test_ttl(self):
+        """Истёкшие записи не возвращаются."""
+        self.cache.set('short', 'value', timeout=0.05)
+        self.cache.set('forever', 'value', timeout=None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.assertFalse(self.cache.touch('short'))
+
+    def test_lru_eviction_by_size(self):
+        """При переполнении вытесняются давно не использованные записи."""
+        cache = self.make_cache(MAX_SIZE=4096)
+        cache.set('recent', 'x' * 500)
+        for number in range(20):
+            cache.set(f'key-{number}', 'x' * 500)
+            cache.get('recent')
+        self.assertEqual(cache.get('recent'), 'x' * 500)
+        self.assertIsNone(cache.get('key-0'))
+        self.assertEqual(cache.get('key-19'), 'x' * 500)
+
+    def test_tombstones_are_rebuilt(self):
+        """Частые удаления не копят надгробия в индексе."""
+        cache = self.make_cache(MAX_ENTRIES=20)
+        cache.set('kept', 'value')
+        for number in range(100):
+            cache.set(f'key-{number}', number)
+            cache.delete(f'key-{number}')
+        with cache._locked() as mm:
+            tombstones = cache._read_header(mm)[2]
+        self.assertLessEqual(tombstones, cache._slots // 4)
+        self.assertEqual(cache.get('kept'), 'value')
+        self.assertIsNone(cache.get('key-99'))
+
+    def test_entries_shared_between_instances(self):
+        """Разные экземпляры видят один и тот же файл."""
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+        self.make_cache().clear()
+        self.assertIsNone(self.cache.get('shared'))
+
+    def test_foreign_file_refused(self):
+        """Файл, доступный другим пользователям, не открывается."""
+        with open(self.location, 'wb'):
+            pass
+        os.chmod(self.location, 0o666)
+        with self.assertRaises(ImproperlyConfigured):
+            self.cache.get('key')
+        link = os.path.join(self.directory, 'link.cache')
+        os.symlink(self.location, link)
+        with self.assertRaises(OSError):
+            MmapCache(link, {}).get('key')
+
+    def test_concurrent_incr_from_processes(self):
+        """incr атомарен при одновременном доступе нескольких процессов."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=increment_counter, args=(self.location, 50)
+            )
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import instrumentation
+from ..middleware.coalescing import RequestCoalescingMiddleware
+
+
+class SlowView:
+    """Представление, которое рендерится заданное время."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.calls += 1
+            number = self.calls
+        time.sleep(self.delay)
+        return HttpResponse(f'render {number}')
+
+
+class RequestCoalescingMiddlewareTests(SimpleTestCase):
+    """Тесты объединения одинаковых запросов."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def make_request(self, path='/', user=None):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return request
+
+    def run_concurrently(self, middleware, requests):
+        responses = [None] * len(requests)
+
+        def worker(number):
+            responses[number] = middleware(requests[number])
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(len(requests))
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_identical_anonymous_requests_rendered_once(self):
+        """Одинаковые запросы анонимов рендерятся один раз."""
+        view = SlowView(0.3)
+        middleware = RequestCoalescingMiddleware(view)
+        responses = self.run_concurrently(
+            middleware, [self.make_request() for _ in range(5)]
+        )
+        self.assertEqual(view.calls, 1)
+        for response in responses:
+            self.assertEqual(response.content, b'render 1')
+        self.assertEqual(len({id(response) for response in responses}), 5)
+
+    def test_copies_labelled_with_view_name(self):
+        """Получившие копию запросы учитываются под своим представлением."""
+        middleware = RequestCoalescingMiddleware(SlowView(0.3))
+        names = []
+
+        def instrumented(request):
+            instrumentation.start()
+            response = middleware(request)
+            names.append(instrumentation.stop().view_name)
+            return response
+
+        self.run_concurrently(
+            instrumented, [self.make_request() for _ in range(3)]
+        )
+        # Имя ведущему проставляет ServerTimingMiddleware.process_view
+        self.assertEqual(sorted(names, key=str), [None] + ['posts:index'] * 2)
+
+    def test_authenticated_requests_not_coalesced(self):
+        """Запросы авторизованных пользователей не объединяются."""
+        view = SlowView(0.1)
+        middleware = RequestCoalescingMiddleware(view)
+        user = User(username='user')
+        self.run_concurrently(
+            middleware,
+            [self.make_request(user=user) for _ in range(3)]
+        )
+        self.assertEqual(view.calls, 3)
+
+    def test_other_pages_not_coalesced(self):
+        """Страницы вне COALESCE_URL_NAMES обрабатываются как обычно."""
+        view = SlowView(0.1)
+        middleware = RequestCoalescingMiddleware(view)
+        self.run_concurrently(
+            middleware,
+            [self.make_request('/about/author/') for _ in range(3)]
+        )
+        self.assertEqual(view.calls, 3)
+
+    @override_settings(COALESCE_TIMEOUT=0.05)
+    def test_timeout_falls_back_to_own_render(self):
+        """После таймаута ожидающий запрос рендерит страницу сам."""
+        view = SlowView(0.3)
+        middleware = RequestCoalescingMiddleware(view)
+        self.run_concurrently(
+            middleware, [self.make_request() for _ in range(2)]
+        )
+        self.assertEqual(view.calls, 2)
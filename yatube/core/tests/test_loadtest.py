@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.signals import got_request_exception
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import Comment, Group, Post, User
+
+from .. import loadtest
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, DEBUG=False)
+class LoadTestTests(TransactionTestCase):
+    """Тесты нагрузочного прогона в том же процессе."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for number in range(2):
+            user = User.objects.create_user(f'user{number}', password='pass')
+            Post.objects.create(
+                author=user, text='Тестовый пост',
+                group=Group.objects.create(
+                    title='Группа', slug=f'group{number}', description='-'
+                )
+            )
+
+    def test_mixed_workload(self):
+        """Все сценарии выполняются без ошибок и попадают в отчёт."""
+        mix = loadtest.parse_mix('browse=1,create=1,comment=1,follow=1')
+        data = loadtest.sample_data('pass')
+        results, elapsed = loadtest.run(None, data, mix, duration=1)
+        self.assertFalse(results.errors)
+        self.assertFalse(results.exceptions)
+        for label in ('index', 'profile', 'login', 'post_create',
+                      'add_comment', 'follow', 'unfollow'):
+            self.assertIn(label, results.timings)
+        self.assertGreater(Post.objects.count(), 2)
+        self.assertTrue(Comment.objects.exists())
+        report = loadtest.report(results, elapsed)
+        self.assertIn('запросов/с', report[0])
+
+    def test_exception_counted_once(self):
+        """Исключение учитывается один раз при любом числе потоков."""
+        raised = threading.Event()
+
+        def browse(client):
+            if raised.is_set():
+                return
+            raised.set()
+            try:
+                raise RuntimeError('сбой')
+            except RuntimeError:
+                got_request_exception.send(sender=None)
+
+        data = loadtest.sample_data('pass')
+        with mock.patch.object(loadtest.VirtualUser, 'browse', browse):
+            results, _ = loadtest.run(
+                None, data, {'browse': 1}, duration=0.2, threads=3
+            )
+        self.assertEqual(results.exceptions, {'сбой': 1})
+        self.assertFalse(got_request_exception.has_listeners(None))
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix('browse=3,login'),
+            {'browse': 3, 'login': 1}
+        )
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('unknown=1')
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import labels, registry
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    METRICS_DIR=METRICS_DIR, METRICS_ENABLED=True, METRICS_TOKEN='secret'
+)
+class MetricsTests(TestCase):
+    """Тесты для метрик по представлениям."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        for filename in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, filename))
+
+    def get_metrics(self):
+        return self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+
+    def test_requests_labelled_by_url_name(self):
+        """Запросы учитываются с именем URL и статусом."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/nonexist-page/')
+        body = self.get_metrics().content.decode()
+        self.assertIn(
+            'yatube_http_requests_total{status="200",view="posts:index"} 2',
+            body
+        )
+        self.assertIn(
+            'yatube_http_requests_total{status="404",view="unmatched"} 1',
+            body
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2',
+            body
+        )
+        self.assertIn(
+            'yatube_cache_hit_ratio{view="posts:index"} 0.5', body
+        )
+        self.assertIn('# TYPE yatube_db_duration_seconds histogram', body)
+
+    def test_snapshots_of_workers_are_summed(self):
+        """Значения из файлов других процессов складываются."""
+        key = labels(view='posts:index', status='200')
+        registry.inc('http_requests_total', key)
+        with open(os.path.join(METRICS_DIR, '1.json'), 'w') as file:
+            json.dump({
+                'counters': [['http_requests_total', list(key), 4]],
+                'histograms': [],
+            }, file)
+        body = self.get_metrics().content.decode()
+        self.assertIn(
+            'yatube_http_requests_total{status="200",view="posts:index"} 5',
+            body
+        )
+
+    def test_histogram_has_inf_bucket(self):
+        """Значения больше последней границы попадают только в +Inf."""
+        key = labels(view='posts:index')
+        registry.observe('db_duration_seconds', key, 0.003)
+        registry.observe('db_duration_seconds', key, 20)
+        body = self.get_metrics().content.decode()
+        self.assertIn(
+            'yatube_db_duration_seconds_bucket'
+            '{view="posts:index",le="10"} 1',
+            body
+        )
+        self.assertIn(
+            'yatube_db_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            body
+        )
+        self.assertIn(
+            'yatube_db_duration_seconds_sum{view="posts:index"} 20.003',
+            body
+        )
+
+    def test_snapshots_of_dead_workers_are_removed(self):
+        """Снимки завершившихся процессов не учитываются и удаляются."""
+        key = labels(view='posts:index', status='200')
+        path = os.path.join(METRICS_DIR, '999999999.json')
+        with open(path, 'w') as file:
+            json.dump({
+                'counters': [['http_requests_total', list(key), 4]],
+                'histograms': [],
+            }, file)
+        body = self.get_metrics().content.decode()
+        self.assertNotIn('view="posts:index"} 4', body)
+        self.assertFalse(os.path.exists(path))
+
+    def test_token_required(self):
+        """Без верного токена метрики недоступны, в том числе локально."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(
+                    reverse('metrics'), REMOTE_ADDR='127.0.0.1', **headers
+                )
+                self.assertEqual(response.status_code, 404)
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.get_metrics().status_code, 404)
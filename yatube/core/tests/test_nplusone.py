@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import nplusone
+
+User = get_user_model()
+
+POSTS_TEMPLATE = Template(
+    '{% for post in posts %}\n'
+    '{{ post.author.username }}\n'
+    '{% endfor %}'
+)
+
+
+@override_settings(NPLUSONE_DETECTION='raise')
+class NPlusOneDetectionTests(TestCase):
+    """Тесты обнаружения N+1 запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        nplusone.install()
+        for number in range(3):
+            author = User.objects.create_user(username=f'author{number}')
+            Post.objects.create(author=author, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lazy_loads_in_template_raise(self):
+        """Ленивая загрузка автора в цикле шаблона обнаруживается."""
+        with self.assertRaisesMessage(
+                nplusone.NPlusOneError, 'Post.author') as context:
+            POSTS_TEMPLATE.render(Context({'posts': Post.objects.all()}))
+        self.assertIn('<string>:2', str(context.exception))
+
+    def test_select_related_is_not_reported(self):
+        """С select_related предупреждения нет."""
+        POSTS_TEMPLATE.render(Context({
+            'posts': Post.objects.select_related('author')
+        }))
+
+    def test_single_object_is_not_reported(self):
+        """Загрузка связи одного объекта - не N+1."""
+        post = Post.objects.first()
+        self.assertTrue(post.author.username)
+
+    @override_settings(NPLUSONE_DETECTION='warn')
+    def test_warn_mode(self):
+        """В режиме warn выдаётся предупреждение."""
+        with self.assertWarns(nplusone.NPlusOneWarning):
+            [post.author for post in Post.objects.all()]
+
+    def test_feed_views_have_no_n_plus_one(self):
+        """Ленты не загружают связи лениво."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+        ):
+            with self.subTest(url=url):
+                self.client.get(url)
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..profiling import make_token
+
+User = get_user_model()
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILE_DIR=PROFILE_DIR, PROFILE_INTERVAL=0.0001)
+class ProfilingMiddlewareTests(TestCase):
+    """Тесты профилирования запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AuthorUser')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+
+    def dumps(self, view_name='posts.post_detail'):
+        directory = os.path.join(PROFILE_DIR, view_name)
+        if not os.path.isdir(directory):
+            return []
+        return [
+            os.path.join(directory, name) for name in os.listdir(directory)
+        ]
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_request_dumped_by_view(self):
+        """Результат семплера сохраняется в каталог представления."""
+        self.client.get(self.url)
+        dumps = self.dumps()
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].endswith('.collapsed'))
+        with open(dumps[0], encoding='utf-8') as file:
+            for line in file:
+                stack, count = line.rsplit(' ', 1)
+                self.assertTrue(int(count) > 0)
+                self.assertIn(':', stack)
+
+    @override_settings(PROFILE_SAMPLE_RATE=0, PROFILER='cprofile')
+    def test_signed_token(self):
+        """Запрос с подписанным токеном профилируется всегда."""
+        self.client.get(self.url, {'_profile': make_token()})
+        dumps = self.dumps()
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].endswith('.prof'))
+
+    @override_settings(PROFILE_SAMPLE_RATE=0)
+    def test_bad_token_and_unsampled_requests(self):
+        """Без выборки и с поддельным токеном профиль не снимается."""
+        self.client.get(self.url)
+        self.client.get(self.url, HTTP_X_PROFILE_TOKEN='forged:token')
+        self.assertEqual(self.dumps(), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=0)
+    def test_token_cannot_be_replayed(self):
+        """Токен действует на выданное число запросов."""
+        token = make_token()
+        self.client.get(self.url, {'_profile': token})
+        self.client.get(self.url, {'_profile': token})
+        self.assertEqual(len(self.dumps()), 1)
+        token = make_token(uses=2)
+        for _ in range(3):
+            self.client.get(self.url, HTTP_X_PROFILE_TOKEN=token)
+        self.assertEqual(len(self.dumps()), 3)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_MAX_FILES=2)
+    def test_old_dumps_removed(self):
+        """Хранятся только последние PROFILE_MAX_FILES файлов."""
+        for _ in range(4):
+            self.client.get(self.url)
+        self.assertEqual(len(self.dumps()), 2)
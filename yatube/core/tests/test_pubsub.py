@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..pubsub import Broadcaster
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01)
+class BroadcasterTests(SimpleTestCase):
+    """Тесты рассылки событий через общий журнал."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'events')
+        # Два Broadcaster на один журнал - как два воркера
+        self.publisher = Broadcaster(self.path)
+        self.listener = Broadcaster(self.path)
+
+    def receive(self, subscription, count):
+        return [subscription.get(timeout=5) for _ in range(count)]
+
+    def test_events_reach_other_process_subscribers(self):
+        """Подписчик получает события своих каналов от другого воркера."""
+        with self.listener.subscribe(['a', 'b']) as subscription:
+            self.publisher.publish(['a'], 'post', 1)
+            self.publisher.publish(['c'], 'post', 2)
+            self.publisher.publish(['c', 'b'], 'post', 3)
+            self.assertEqual(self.receive(subscription, 2), [
+                ('a', 'post', 1), ('b', 'post', 3),
+            ])
+            self.assertIsNone(subscription.get(timeout=0.1))
+
+    @override_settings(LIVE_EVENTS_MAX_SIZE=100)
+    def test_rotation(self):
+        """При ротации журнала события не теряются."""
+        with self.listener.subscribe(['a']) as subscription:
+            for number in range(10):
+                self.publisher.publish(['a'], 'post', number)
+                self.assertEqual(
+                    subscription.get(timeout=5), ('a', 'post', number)
+                )
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertLess(os.path.getsize(self.path), 200)
+
+    def test_reader_stops_without_subscribers(self):
+        subscription = self.listener.subscribe(['a'])
+        reader = self.listener.reader
+        subscription.close()
+        reader.join(timeout=5)
+        self.assertFalse(reader.is_alive())
+        self.assertIsNone(self.listener.reader)
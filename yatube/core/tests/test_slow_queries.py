@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..slow_queries import fingerprint
+
+User = get_user_model()
+LOG_DIR = tempfile.mkdtemp()
+SLOW_QUERY_LOG = os.path.join(LOG_DIR, 'slow_queries.jsonl')
+
+
+class FingerprintTests(TestCase):
+    """Тесты нормализации текста запроса."""
+
+    def test_literals_removed(self):
+        """Литералы и списки параметров заменяются заглушками."""
+        self.assertEqual(
+            fingerprint(
+                "SELECT * FROM t  WHERE a = 'x' AND b = 10\n"
+                "AND c IN (%s, %s, %s) LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) LIMIT ?'
+        )
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=SLOW_QUERY_LOG)
+class SlowQueryLogTests(TestCase):
+    """Тесты журнала медленных запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AuthorUser')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(LOG_DIR, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(SLOW_QUERY_LOG):
+            os.remove(SLOW_QUERY_LOG)
+
+    def read_log(self):
+        with open(SLOW_QUERY_LOG, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_slow_query_logged_with_plan(self):
+        """Медленный запрос попадает в журнал вместе с планом."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            list(Post.objects.filter(author=self.user))
+        entry = self.read_log()[-1]
+        self.assertIn('posts_post', entry['sql'])
+        self.assertIn('?', entry['fingerprint'])
+        self.assertTrue(entry['plan'])
+
+    def test_plan_not_counted_as_query(self):
+        """EXPLAIN не засчитывается запросам приложения."""
+        with self.assertNumQueries(1):
+            with self.assertLogs('yatube.slow_queries', 'WARNING'):
+                list(Post.objects.filter(author=self.user))
+        self.assertTrue(self.read_log()[-1]['plan'])
+
+    def test_view_name_recorded(self):
+        """В журнал попадает имя представления."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            self.client.get(reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ))
+        views = {entry['view'] for entry in self.read_log()}
+        self.assertIn('posts:profile', views)
+
+    def test_summary_command(self):
+        """Команда выводит отпечатки по убыванию суммарного времени."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            for _ in range(3):
+                list(Post.objects.filter(author=self.user))
+        out = StringIO()
+        call_command('slow_queries', '--plans', stdout=out)
+        self.assertIn('count=3', out.getvalue())
+        self.assertIn('"posts_post"', out.getvalue())
@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import caches
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..cache_backends.stampede import MAX_MISSES, Envelope
+
+STAMPEDE_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.stampede.StampedeProtectedCache',
+        'LOCATION': 'inner',
+    },
+    'inner': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stampede-tests',
+    },
+}
+
+
+@override_settings(CACHES=STAMPEDE_CACHES)
+class StampedeProtectedCacheTests(SimpleTestCase):
+    """Тесты защиты от cache stampede."""
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.inner = caches['inner']
+        self.cache.clear()
+
+    def test_fresh_value(self):
+        """Свежее значение отдаётся всем."""
+        self.cache.set('key', 'value', 60)
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_single_flight_after_expiry(self):
+        """
+        После мягкого истечения пересчитывает только один клиент,
+        остальные получают устаревшее значение.
+        """
+        self.cache.set('key', 'stale', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key'), 'stale')
+        self.assertEqual(self.cache.get('key'), 'stale')
+        self.cache.set('key', 'fresh', 60)
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+    def test_probabilistic_early_recompute(self):
+        """Дорогое значение пересчитывается до истечения срока."""
+        self.inner.set('key', Envelope('value', time.time() + 1, 10 ** 6))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_recompute_time_is_recorded(self):
+        """Время между промахом и записью сохраняется вместе со значением."""
+        self.assertIsNone(self.cache.get('key'))
+        time.sleep(0.05)
+        self.cache.set('key', 'value', 60)
+        self.assertGreaterEqual(self.inner.get('key').delta, 0.05)
+
+    def test_zero_timeout_is_not_served(self):
+        """Значение с timeout=0 не отдаётся даже как устаревшее."""
+        self.cache.set('key', 'value', 0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_misses_without_set_are_bounded(self):
+        """Промахи без последующей записи не копятся бесконечно."""
+        for number in range(MAX_MISSES + 10):
+            self.cache.get(f'absent-{number}')
+        self.assertEqual(len(self.cache._misses()), MAX_MISSES)
+
+    def test_cache_template_tag(self):
+        """Тег {% cache %} работает через защищённый кэш."""
+        template = Template(
+            '{% load cache %}{% cache 60 fragment %}{{ value }}{% endcache %}'
+        )
+        self.assertEqual(template.render(Context({'value': 1})), '1')
+        self.assertEqual(template.render(Context({'value': 2})), '1')
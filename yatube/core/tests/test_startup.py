@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+
+from .. import startup
+
+
+class StartupTests(SimpleTestCase):
+    """Тесты холодного старта воркера."""
+
+    def test_production_skips_debug_tooling(self):
+        """В рабочем окружении отладочные средства не импортируются."""
+        modules = {
+            name for name, _, _, _ in
+            startup.import_times('yatube.settings_production')
+        }
+        self.assertIn('yatube.wsgi', modules)
+        for name in ('debug_toolbar', 'core.nplusone'):
+            self.assertNotIn(name, modules)
+
+    def test_boot_time(self):
+        self.assertGreater(startup.boot_time('yatube.settings'), 0)
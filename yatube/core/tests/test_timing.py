@@ -0,0 +1,75 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import instrumentation
+from ..middleware.timing import ServerTimingMiddleware
+
+User = get_user_model()
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    """Тесты сбора показателей производительности запроса."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AuthorUser')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing со всеми метриками."""
+        response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        # Фрагмент страницы, версии счётчиков отметок «нравится» её
+        # постов и сами счётчики
+        self.assertIn('misses=3', header)
+
+    def test_structured_log(self):
+        """Показатели запроса пишутся в лог одной строкой JSON."""
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(data['view'], 'posts:index')
+        self.assertEqual(data['status'], 200)
+        self.assertGreater(data['db_queries'], 0)
+        self.assertGreater(data['template_ms'], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling(self):
+        """Запросы вне выборки не замеряются."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_timer_removed_when_wrappers_added(self):
+        """
+        Обёртка, добавленная за время запроса (например, при переоткрытии
+        соединения), не оставляет query_timer в соединении.
+        """
+        def other(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        def get_response(request):
+            connection.execute_wrappers.append(other)
+            return HttpResponse()
+
+        self.addCleanup(connection.execute_wrappers.remove, other)
+        middleware = ServerTimingMiddleware(get_response)
+        for _ in range(3):
+            middleware(RequestFactory().get('/'))
+        self.assertNotIn(
+            instrumentation.query_timer, connection.execute_wrappers
+        )
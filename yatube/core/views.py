@@ -1,7 +1,12 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     return render(
@@ -32,3 +37,20 @@ def custom_permission_denied_view(request, exception):
         {'path': request.path},
         status=HTTPStatus.FORBIDDEN.value
     )
+
+
+def metrics(request):
+    """
+    Метрики всех воркеров в текстовом формате. Доступны только с
+    заголовком Authorization: Bearer METRICS_TOKEN, без токена - 404.
+    За обратным прокси все запросы приходят с 127.0.0.1, поэтому адрес
+    клиента не проверяется.
+    """
+    token = settings.METRICS_TOKEN
+    given = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(given, f'Bearer {token}'):
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
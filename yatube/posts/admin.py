@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, Like, PostStats
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -46,7 +46,25 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class LikeAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'post',
+    )
+    list_filter = ('user',)
+
+
+class PostStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'post',
+        'views',
+    )
+    ordering = ('-views',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(PostStats, PostStatsAdmin)
+admin.site.register(Like, LikeAdmin)
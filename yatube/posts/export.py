@@ -0,0 +1,143 @@
+"""
+Потоковая выгрузка постов и комментариев.
+
+Записи читаются из базы курсором порциями по EXPORT_CHUNK_SIZE и сразу
+отдаются клиенту, поэтому память воркера не зависит от числа постов.
+В jsonl и csv посты и комментарии идут одним потоком и различаются
+полем type; авторы и группы указаны именем и slug. Это выгрузка для
+чтения, а не для manage.py import_content: тот ждёт записи разных типов
+в отдельных файлах и ссылки на пользователей и группы из тех же файлов.
+"""
+import csv
+import json
+import zipfile
+
+from django.conf import settings
+
+from .models import Comment, Post
+
+FORMATS = ('jsonl', 'csv', 'zip')
+
+CSV_FIELDS = ('type', 'id', 'post', 'author', 'group', 'pub_date', 'text',
+              'image')
+
+# Размер куска при копировании картинок в архив
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+
+def post_records(posts):
+    rows = posts.values(
+        'id', 'author__username', 'group__slug', 'pub_date', 'text', 'image'
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield {
+            'type': 'post',
+            'id': row['id'],
+            'author': row['author__username'],
+            'group': row['group__slug'],
+            'pub_date': row['pub_date'].isoformat(),
+            'text': row['text'],
+            'image': row['image'] or None,
+        }
+
+
+def comment_records(comments):
+    rows = comments.values(
+        'id', 'post_id', 'author__username', 'pub_date', 'text'
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield {
+            'type': 'comment',
+            'id': row['id'],
+            'post': row['post_id'],
+            'author': row['author__username'],
+            'pub_date': row['pub_date'].isoformat(),
+            'text': row['text'],
+        }
+
+
+def author_querysets(author):
+    """Посты автора и его комментарии."""
+    return (
+        Post.objects.filter(author=author),
+        Comment.objects.filter(author=author).order_by('pk'),
+    )
+
+
+def group_querysets(group):
+    """Посты группы и комментарии к ним."""
+    return (
+        Post.objects.filter(group=group),
+        Comment.objects.filter(post__group=group).order_by('pk'),
+    )
+
+
+def jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+class ZipBuffer:
+    """Поток без seek для zipfile: записанное забирается кусками."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def zip_archive(posts, comments):
+    """
+    Архив с posts.jsonl, comments.jsonl и картинками постов. Размеры и
+    контрольные суммы пишутся после данных, поэтому архив собирается
+    на лету.
+    """
+    buffer = ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        members = (
+            ('posts.jsonl', jsonl(post_records(posts))),
+            ('comments.jsonl', jsonl(comment_records(comments))),
+        )
+        for name, lines in members:
+            with archive.open(name, 'w', force_zip64=True) as file:
+                for line in lines:
+                    file.write(line.encode())
+                    yield buffer.pop()
+        # Картинки - вторым проходом, чтобы не копить их имена в памяти
+        storage = Post._meta.get_field('image').storage
+        images = posts.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        for name in images:
+            if not storage.exists(name):
+                continue
+            with storage.open(name) as source, \
+                    archive.open(name, 'w', force_zip64=True) as file:
+                for chunk in iter(lambda: source.read(IMAGE_CHUNK_SIZE), b''):
+                    file.write(chunk)
+                    yield buffer.pop()
+    yield buffer.pop()
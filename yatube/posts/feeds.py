@@ -0,0 +1,151 @@
+"""
+RSS и Atom ленты главной, групп и авторов.
+
+Элементы ленты - та же страница постов, что и в HTML-ленте (параметр
+?page=, тот же запрос и индексы). Готовый XML кэшируется, а ответ
+поддерживает условные GET-запросы: ETag и Last-Modified вычисляются по
+моменту последнего изменения постов без обращения к базе, поэтому
+опрос ленты без изменений стоит одного чтения из кэша. Момент изменения
+обновляется при сохранении и удалении поста (posts.signals).
+"""
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .func import paginator, posts_changed, posts_etag
+from .models import Group, Post, User
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+# Источник ленты (группа, автор или None) и страница постов
+FeedPage = namedtuple('FeedPage', ('source', 'page_obj'))
+
+
+def feed_last_modified(request, **kwargs):
+    return datetime.fromtimestamp(posts_changed(), timezone.utc)
+
+
+class PostsFeed(Feed):
+    """Общая часть лент постов."""
+
+    def get_object(self, request, **kwargs):
+        source = self.get_source(**kwargs)
+        return FeedPage(
+            source, paginator(self.get_queryset(source), request)
+        )
+
+    def get_source(self, **kwargs):
+        return None
+
+    def items(self, page):
+        return page.page_obj.object_list
+
+    def item_title(self, post):
+        return Truncator(post.text).words(10)
+
+    def item_description(self, post):
+        return linebreaksbr(post.text)
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние обновления на сайте'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_queryset(self, source):
+        return Post.objects.select_related('author', 'group')
+
+
+class GroupFeed(PostsFeed):
+
+    def get_source(self, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, page):
+        return f'Yatube: записи сообщества {page.source.title}'
+
+    def description(self, page):
+        return page.source.description
+
+    def link(self, page):
+        return reverse('posts:group_list', args=[page.source.slug])
+
+    def get_queryset(self, group):
+        return group.posts.select_related('author')
+
+
+class AuthorFeed(PostsFeed):
+
+    def get_source(self, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, page):
+        author = page.source
+        return f'Yatube: записи {author.get_full_name() or author.username}'
+
+    def description(self, page):
+        return f'Все записи пользователя {page.source.username}'
+
+    def link(self, page):
+        return reverse('posts:profile', args=[page.source.username])
+
+    def get_queryset(self, author):
+        return author.posts.select_related('author', 'group')
+
+
+def feed_view(feed_class):
+    """
+    Представление ленты в формате из URL (rss или atom) с кэшированием
+    XML и условными GET-запросами.
+    """
+    feeds = {}
+    for name, feed_type in FEED_TYPES.items():
+        feeds[name] = feed_class()
+        feeds[name].feed_type = feed_type
+
+    @condition(etag_func=posts_etag, last_modified_func=feed_last_modified)
+    def view(request, feed_format, **kwargs):
+        if feed_format not in feeds:
+            raise Http404(f'Неизвестный формат ленты: {feed_format}')
+        key = f'feed:{posts_etag(request)}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = feeds[feed_format](request, **kwargs)
+        cache.set(
+            key, (response.content, response['Content-Type']),
+            settings.FEED_CACHE_TIMEOUT
+        )
+        return response
+
+    return view
+
+
+index_feed = feed_view(IndexFeed)
+group_feed = feed_view(GroupFeed)
+author_feed = feed_view(AuthorFeed)
@@ -1,10 +1,120 @@
+import hashlib
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from contextlib import contextmanager
+
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 
 from django.conf import settings
 
+# Ключ кэша с моментом последнего изменения постов
+POSTS_CHANGED_KEY = 'posts:changed'
+
 
-def paginator(post_list, request):
-    """ Функция для разбивки постов на страницы """
+def paginator(post_list, request, count=None):
+    """
+    Функция для разбивки постов на страницы.
+    count - заранее известное число постов, если посчитать его
+    отдельным запросом дешевле, чем через post_list.
+    """
     result = Paginator(post_list, settings.POSTS_LIMIT)
+    if count is not None:
+        result.count = count
     page_number = request.GET.get('page')
     return result.get_page(page_number)
+
+
+def encode_cursor(pub_date, pk):
+    return urlsafe_b64encode(f'{pub_date.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Дата и id из курсора; ValueError, если курсор испорчен."""
+    try:
+        pub_date, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as error:
+        raise ValueError(f'Неверный курсор: {cursor}') from error
+    if pub_date is None:
+        raise ValueError(f'Неверный курсор: {cursor}')
+    return pub_date, pk
+
+
+def cursor_page(queryset, cursor=None, limit=None):
+    """
+    Страница записей с pub_date (постов, комментариев) по курсору:
+    от новых к старым, начиная после записи, на которую указывает cursor.
+    В отличие от номера страницы курсор не требует OFFSET и COUNT: запрос
+    сразу находит начало страницы по индексу (..., -pub_date).
+    Возвращает записи и курсор следующей страницы (None - это последняя).
+    queryset может быть и values(), тогда в нём нужны pk и pub_date.
+    """
+    limit = limit or settings.POSTS_LIMIT
+    # В индексе по -pub_date при равных датах строки идут по возрастанию id
+    queryset = queryset.order_by('-pub_date', 'pk')
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, pk__lte=pk
+        )
+    items = list(queryset[:limit + 1])
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    if isinstance(last, dict):
+        return items, encode_cursor(last['pub_date'], last['pk'])
+    return items, encode_cursor(last.pub_date, last.pk)
+
+
+def more_url(url_name, args, pub_date, pk):
+    """Адрес порции ленты (бесконечная прокрутка) после записи pk."""
+    cursor = urlencode({'cursor': encode_cursor(pub_date, pk)})
+    return f'{reverse(url_name, args=args)}?{cursor}'
+
+
+@contextmanager
+def explicit_pub_date(*models):
+    """
+    Позволяет сохранить заданную вручную дату создания: на время блока
+    отключает auto_now_add у поля pub_date. Только для команд управления.
+    """
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def touch_posts():
+    """
+    Отмечает изменение постов: ETag и кэш, зависящие от posts_changed(),
+    устаревают. Вызывается сигналами Post и после массовой загрузки.
+    """
+    cache.set(POSTS_CHANGED_KEY, time.time(), None)
+
+
+def posts_changed():
+    """Момент последнего изменения постов (time.time())."""
+    stamp = cache.get(POSTS_CHANGED_KEY)
+    if stamp is None:
+        # Отметка вытеснена из кэша: считаем, что посты только что изменились
+        stamp = time.time()
+        if not cache.add(POSTS_CHANGED_KEY, stamp, None):
+            stamp = cache.get(POSTS_CHANGED_KEY, stamp)
+    return stamp
+
+
+def posts_etag(request, *args, **kwargs):
+    """ETag страницы, зависящей только от постов: без обращения к базе."""
+    return hashlib.md5(
+        f'{posts_changed()!r}:{request.get_full_path()}'.encode()
+    ).hexdigest()
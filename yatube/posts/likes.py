@@ -0,0 +1,128 @@
+"""
+Отметки «нравится» с шардированными счётчиками.
+
+Число отметок поста хранится в LIKE_SHARDS строках PostLikeShard:
+отметка прибавляет единицу к случайной из них, поэтому одновременные
+отметки популярного поста не ждут друг друга на одной строке. Для
+страницы ленты шарды всех её постов суммируются одним запросом, суммы
+кэшируются до следующей отметки поста. Отметки текущего пользователя
+на странице проверяются тоже одним запросом, так что лайки добавляют
+к ленте постоянное число запросов, а не по запросу на карточку.
+"""
+import random
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import Like, PostLikeShard
+
+
+def version_key(post_id):
+    return f'likes:version:{post_id}'
+
+
+def count_key(post_id, version):
+    return f'likes:count:{post_id}:{version}'
+
+
+def add_to_shard(post_id, delta):
+    """Прибавляет delta к случайному шарду счётчика поста."""
+    shard = random.randrange(settings.LIKE_SHARDS)
+    shards = PostLikeShard.objects.filter(post_id=post_id, shard=shard)
+    if shards.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            PostLikeShard.objects.create(
+                post_id=post_id, shard=shard, count=delta
+            )
+    except IntegrityError:
+        # Шард одновременно создал другой запрос
+        shards.update(count=F('count') + delta)
+
+
+def changed(post_id):
+    """
+    Меняет версию счётчика поста. Сумма, прочитанная из базы до отметки,
+    попадает в кэш под старой версией и больше не читается, даже если
+    её положили туда уже после отметки.
+    """
+    cache.set(version_key(post_id), uuid.uuid4().hex, None)
+
+
+def count_versions(post_ids):
+    """Текущие версии счётчиков постов; недостающие создаются."""
+    keys = {version_key(pk): pk for pk in post_ids}
+    versions = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    for pk in post_ids:
+        if pk not in versions:
+            # Версия вытеснена из кэша: старые суммы под прежней
+            # версией не должны читаться снова
+            version = uuid.uuid4().hex
+            if not cache.add(version_key(pk), version, None):
+                version = cache.get(version_key(pk), version)
+            versions[pk] = version
+    return versions
+
+
+def like(user, post_id):
+    """Ставит отметку; False, если она уже была."""
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, post_id=post_id)
+            add_to_shard(post_id, 1)
+    except IntegrityError:
+        return False
+    changed(post_id)
+    return True
+
+
+def unlike(user, post_id):
+    """Снимает отметку; False, если её не было."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            add_to_shard(post_id, -1)
+    if deleted:
+        changed(post_id)
+    return bool(deleted)
+
+
+def like_counts(post_ids):
+    """Число отметок постов: из кэша, недостающие - одним запросом."""
+    # Версии читаются до сумм из базы: отметка после этого меняет версию
+    versions = count_versions(post_ids)
+    keys = {count_key(pk, versions[pk]): pk for pk in post_ids}
+    counts = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in post_ids if pk not in counts]
+    if missing:
+        found = dict.fromkeys(missing, 0)
+        found.update(
+            PostLikeShard.objects.filter(post_id__in=missing)
+            .values('post_id').order_by()
+            .annotate(total=Sum('count')).values_list('post_id', 'total')
+        )
+        cache.set_many(
+            {
+                count_key(pk, versions[pk]): total
+                for pk, total in found.items()
+            },
+            settings.LIKE_COUNT_TIMEOUT
+        )
+        counts.update(found)
+    return counts
+
+
+def liked_posts(user, post_ids):
+    """Какие из постов отметил user - одним запросом."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(
+        Like.objects.filter(user=user, post_id__in=post_ids)
+        .values_list('post_id', flat=True)
+    )
@@ -0,0 +1,192 @@
+"""
+Уведомления о новых постах через server-sent events.
+
+Новый пост публикуется (core.pubsub) в канал главной ленты и в канал
+своего автора. Соединение главной ленты подписано на первый, ленты
+подписок - на каналы авторов пользователя. Клиенту уходят только id
+новых постов, карточки он запрашивает сам (posts:post_cards) и
+не перезагружает ленту целиком. При переподключении браузер передаёт
+Last-Event-ID, и пропущенные за это время посты досылаются одним
+запросом; при первом подключении то же делает ?after= - id самого
+нового поста на странице, которая могла быть отдана из кэша.
+
+Каждое соединение занимает поток воркера не дольше LIVE_MAX_AGE секунд,
+поэтому уведомления выключены, пока не задан LIVE_EVENTS, а открытых
+потоков в процессе не больше LIVE_MAX_STREAMS: сверх этого отвечаем 503,
+и браузер приходит снова через BUSY_RETRY_MS. Соединение с базой поток
+не держит - оно закрывается сразу после запроса пропущенных постов.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import connection
+from django.http import (
+    Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+)
+
+from core.pubsub import get_broadcaster
+
+from .models import Follow, Post
+
+logger = logging.getLogger('yatube.live')
+
+INDEX_CHANNEL = 'posts'
+
+# Через сколько миллисекунд браузеру переподключаться
+RETRY_MS: int = 3000
+# Через сколько - если свободных потоков не было
+BUSY_RETRY_MS: int = 30000
+
+
+class StreamSlots:
+    """Число открытых потоков событий процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.count >= settings.LIVE_MAX_STREAMS:
+                return False
+            self.count += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.count -= 1
+
+
+slots = StreamSlots()
+
+
+class SlotStream:
+    """
+    Тело ответа, освобождающее место при закрытии ответа - даже если
+    поток так и не начали читать.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.closed = False
+
+    def __iter__(self):
+        return self.stream
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.stream.close()
+            slots.release()
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def publish_post(post):
+    """Объявляет о новом посте в ленты, где он появится."""
+    if not settings.LIVE_EVENTS:
+        return
+    try:
+        get_broadcaster().publish(
+            [INDEX_CHANNEL, author_channel(post.author_id)], 'post', post.pk
+        )
+    except OSError as error:
+        logger.warning('Не удалось опубликовать пост %s: %s', post.pk, error)
+
+
+def post_event(pk):
+    return f'event: post\nid: {pk}\ndata: {pk}\n\n'
+
+
+def event_stream(channels, post_list, last_id):
+    """
+    Строки SSE: сначала посты после last_id, затем новые по мере
+    публикации, а в тишине - пинги, чтобы прокси не закрыл соединение.
+    Подписка создаётся при первом чтении и снимается при закрытии ответа.
+    """
+    with get_broadcaster().subscribe(channels) as subscription:
+        yield f'retry: {RETRY_MS}\n\n'
+        if last_id is not None:
+            # Если пропущено больше POSTS_LIMIT постов, досылаются самые
+            # новые: после них клиент продолжит с последнего id
+            missed = post_list.filter(pk__gt=last_id).order_by(
+                '-pk'
+            ).values_list('pk', flat=True)
+            missed = list(missed[:settings.POSTS_LIMIT])
+            # Дальше база не нужна, а поток живёт долго
+            connection.close()
+            for pk in reversed(missed):
+                yield post_event(pk)
+        deadline = time.monotonic() + settings.LIVE_MAX_AGE
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            message = subscription.get(min(settings.LIVE_HEARTBEAT, left))
+            if message is None:
+                yield ': ping\n\n'
+            else:
+                _, _, pk = message
+                yield post_event(pk)
+
+
+def events_response(request: HttpRequest, channels,
+                    post_list) -> HttpResponse:
+    if not slots.acquire():
+        response = HttpResponse(
+            f'retry: {BUSY_RETRY_MS}\n\n', status=503,
+            content_type='text/event-stream'
+        )
+        response['Retry-After'] = BUSY_RETRY_MS // 1000
+        return response
+    last_id = request.META.get(
+        'HTTP_LAST_EVENT_ID', request.GET.get('after', '')
+    )
+    response = StreamingHttpResponse(
+        SlotStream(event_stream(
+            channels, post_list, int(last_id) if last_id.isdigit() else None
+        )),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Буферизующий прокси (nginx) задержал бы события
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def live_events(view):
+    """Уведомления выключены, пока не задан LIVE_EVENTS."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.LIVE_EVENTS:
+            raise Http404('Уведомления выключены')
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@live_events
+def index_events(request: HttpRequest) -> HttpResponse:
+    """Новые посты главной ленты."""
+    return events_response(request, [INDEX_CHANNEL], Post.objects.all())
+
+
+@live_events
+@login_required
+def follow_events(request: HttpRequest) -> HttpResponse:
+    """Новые посты авторов, на которых подписан пользователь."""
+    authors = list(
+        Follow.objects.filter(user=request.user)
+        .values_list('author_id', flat=True)
+    )
+    return events_response(
+        request,
+        [author_channel(author) for author in authors],
+        Post.objects.filter(author_id__in=authors)
+    )
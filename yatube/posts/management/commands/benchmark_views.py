@@ -0,0 +1,134 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmark import summarize
+from posts import urls
+from posts.models import Group, Post, User
+
+# Замеряются только GET-страницы, которые ничего не меняют. Потоки
+# уведомлений (events) не заканчиваются, а POST-адреса (лайки, подписки,
+# комментарии) ответили бы на GET 405 или редиректом
+ROUTES = (
+    'posts:index',
+    'posts:index_more',
+    'posts:popular',
+    'posts:group_list',
+    'posts:group_more',
+    'posts:profile',
+    'posts:profile_more',
+    'posts:post_detail',
+    'posts:post_create',
+    'posts:post_edit',
+    'posts:follow_index',
+    'posts:follow_more',
+    'posts:profile_export',
+    'posts:index_feed',
+    'posts:group_feed',
+    'posts:profile_feed',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95 времени ответа и число запросов к базе '
+        'для страниц приложения posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--page', type=int, default=1,
+            help='Номер страницы для лент.'
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.annotate(follows=Count('follower'))
+            .order_by('-follows').first()
+        )
+        if user is None or not Post.objects.exists():
+            raise CommandError(
+                'База пуста, сначала выполните manage.py generate_data'
+            )
+        client = Client()
+        client.force_login(user)
+        routes = self.routes(user)
+        timings = {name: [] for name, _ in routes}
+        queries = {name: [] for name, _ in routes}
+        # Панель отладки не должна влиять на замеры
+        with override_settings(DEBUG=False):
+            for iteration in range(options['warmup'] + options['iterations']):
+                for name, url in routes:
+                    if options['no_cache']:
+                        cache.clear()
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.perf_counter()
+                        response = client.get(url, {'page': options['page']})
+                        if response.streaming:
+                            # Выгрузка читает базу по мере отдачи тела
+                            for _ in response.streaming_content:
+                                pass
+                        elapsed = time.perf_counter() - started
+                    if iteration >= options['warmup']:
+                        timings[name].append(elapsed)
+                        queries[name].append(len(context.captured_queries))
+        self.stdout.write(
+            f"{'URL':<24}{'p50, ms':>10}{'p95, ms':>10}{'queries':>10}"
+        )
+        for name, _ in routes:
+            stats = summarize(timings[name])
+            self.stdout.write(
+                f'{name:<24}{stats["p50"] * 1000:>10.2f}'
+                f'{stats["p95"] * 1000:>10.2f}{max(queries[name]):>10}'
+            )
+
+    @staticmethod
+    def routes(user):
+        """Адрес для каждого URL из ROUTES на самых «тяжёлых» данных."""
+        post = (
+            Post.objects.filter(author=user)
+            .annotate(comments_count=Count('comments'))
+            .order_by('-comments_count').first()
+            or Post.objects.annotate(comments_count=Count('comments'))
+            .order_by('-comments_count').first()
+        )
+        group = (
+            Group.objects.annotate(posts_count=Count('posts'))
+            .order_by('-posts_count').first()
+        )
+        author = (
+            User.objects.annotate(posts_count=Count('posts'))
+            .order_by('-posts_count').first()
+        )
+        arguments = {
+            'slug': group.slug if group else 'none',
+            'username': author.username,
+            'post_id': post.id,
+            'feed_format': 'rss',
+        }
+        # Свою выгрузку пользователь получает, чужую - нет
+        own = {'posts:profile_export': {'username': user.username}}
+        patterns = {
+            f'{urls.app_name}:{pattern.name}': pattern
+            for pattern in urls.urlpatterns
+        }
+        routes = []
+        for name in ROUTES:
+            kwargs = {
+                key: own.get(name, arguments).get(key, arguments[key])
+                for key in patterns[name].pattern.converters
+            }
+            routes.append((name, reverse(name, kwargs=kwargs)))
+        return routes
@@ -0,0 +1,174 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts.func import explicit_pub_date
+from posts.models import Comment, Follow, Group, Post, User
+
+# Показатель степени распределения Ципфа для популярности авторов и постов
+ZIPF_EXPONENT: float = 1.1
+
+# Размер набора заранее сгенерированных текстов
+TEXT_POOL_SIZE: int = 500
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса: первые элементы выбираются намного чаще."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу большим объёмом реалистичных данных: популярные '
+        'авторы, неравномерные подписки и длинные ветки комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=2000000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций.'
+        )
+        parser.add_argument(
+            '--password', default='yatube',
+            help='Пароль всех созданных пользователей.'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        self.texts = [
+            self.fake.text(max_nb_chars=self.random.choice((200, 600, 2000)))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        users = self.create_users(options['users'], options['password'])
+        groups = self.create_groups(options['groups'])
+        # Популярность авторов и постов случайна, но сильно неравномерна
+        self.random.shuffle(users)
+        with explicit_pub_date(Post, Comment):
+            posts = self.create_posts(options['posts'], users, groups)
+            self.random.shuffle(posts)
+            self.create_comments(options['comments'], users, posts)
+        self.create_follows(options['follows'], users)
+
+    def pub_date(self):
+        return self.now - timedelta(seconds=self.random.random() * self.period)
+
+    def bulk_create(self, model, objects, **kwargs):
+        """Создаёт объекты пачками и возвращает id новых записей."""
+        before = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        for start in range(0, len(objects), self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    objects[start:start + self.batch_size], **kwargs
+                )
+        ids = list(
+            model.objects.filter(pk__gt=before).values_list('pk', flat=True)
+        )
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {len(ids)}')
+        return ids
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    def create_users(self, count, password):
+        password = make_password(password)
+        users = [
+            User(
+                username=f'{self.fake.user_name()}_{number}'[:150],
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+            )
+            for number in range(count)
+        ]
+        return self.bulk_create(User, users)
+
+    def create_groups(self, count):
+        groups = [
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'g{number}',
+                description=self.fake.paragraph(),
+            )
+            for number in range(count)
+        ]
+        return self.bulk_create(Group, groups, ignore_conflicts=True)
+
+    def create_posts(self, count, users, groups):
+        authors = zipf_weights(len(users))
+        ids = []
+        for size in self.batches(count):
+            posts = [
+                Post(
+                    author_id=author_id,
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.7 else None
+                    ),
+                    text=self.random.choice(self.texts),
+                    pub_date=self.pub_date(),
+                )
+                for author_id in self.random.choices(
+                    users, cum_weights=authors, k=size
+                )
+            ]
+            ids.extend(self.bulk_create(Post, posts))
+        return ids
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return
+        threads = zipf_weights(len(posts))
+        for size in self.batches(count):
+            comments = [
+                Comment(
+                    post_id=post_id,
+                    author_id=self.random.choice(users),
+                    text=self.random.choice(self.texts)[:300],
+                    pub_date=self.pub_date(),
+                )
+                for post_id in self.random.choices(
+                    posts, cum_weights=threads, k=size
+                )
+            ]
+            self.bulk_create(Comment, comments)
+
+    def create_follows(self, count, users):
+        if len(users) < 2:
+            return
+        authors = zipf_weights(len(users))
+        pairs = set()
+        attempts = 0
+        while len(pairs) < count and attempts < count * 3:
+            attempts += 1
+            user_id = self.random.choice(users)
+            (author_id,) = self.random.choices(users, cum_weights=authors)
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        follows = [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ]
+        self.bulk_create(Follow, follows, ignore_conflicts=True)
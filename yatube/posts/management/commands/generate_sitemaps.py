@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет статические sitemap-файлы постов, профилей и групп: '
+        'перегенерируются только шарды с изменившимися постами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.SITEMAP_ROOT,
+            help='Каталог для sitemap-файлов.'
+        )
+        parser.add_argument(
+            '--base-url', default=settings.SITEMAP_BASE_URL,
+            help='Адрес сайта для абсолютных ссылок.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перегенерировать все шарды.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        regenerated, total = sitemaps.generate(
+            options['output'], options['base_url'].rstrip('/'),
+            options['force']
+        )
+        self.stdout.write(
+            f'Шардов: {total}, перегенерировано: {regenerated} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,332 @@
+import csv
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.func import explicit_pub_date, touch_posts
+from posts.models import Comment, Follow, Group, Post, User
+
+# Порядок импорта: записи ссылаются только на уже загруженные
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+
+
+def read_records(path):
+    """Записи файла JSONL или CSV по одной, не читая файл целиком."""
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(file):
+                yield {
+                    key: value if value != '' else None
+                    for key, value in row.items()
+                }
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def file_kind(path):
+    """Тип записей по имени файла: users.jsonl, posts-2019.csv и т.п."""
+    name = os.path.basename(path).split('.')[0]
+    for kind in KINDS:
+        if name.startswith(kind):
+            return kind
+    raise CommandError(
+        f'{path}: имя файла должно начинаться с одного из {", ".join(KINDS)}'
+    )
+
+
+class Checkpoint:
+    """
+    Состояние импорта по файлам: сколько записей загружено и с какого
+    id начинаются записи файла. Сохраняется после каждой пачки.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.files = {}
+        if not restart and os.path.exists(path):
+            with open(path) as file:
+                self.files = json.load(file)
+
+    def state(self, path):
+        return self.files.setdefault(
+            os.path.abspath(path), {'done': 0, 'first_pk': None}
+        )
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self.files, file)
+        os.replace(temp_path, self.path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт пользователей, групп, постов, комментариев и '
+        'подписок из файлов JSONL или CSV. Тип записей берётся из имени '
+        'файла, ссылки - внешние id из тех же файлов. Прерванный импорт '
+        'продолжается с контрольной точки. Id постов и комментариев '
+        'выделяются заранее, поэтому во время импорта их не должны '
+        'создавать другие процессы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('inputs', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint', default='import_content.checkpoint.json',
+            help='Файл контрольной точки.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не читая контрольную точку.'
+        )
+        parser.add_argument(
+            '--image-workers', type=int, default=8,
+            help='Сколько картинок загружать одновременно.'
+        )
+        parser.add_argument(
+            '--media-source', default=None,
+            help='Каталог картинок, заданных относительным путём; '
+                 'по умолчанию - каталог файла с постами.'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.media_source = options['media_source']
+        self.checkpoint = Checkpoint(options['checkpoint'], options['restart'])
+        # Внешний id -> id в базе
+        self.users = {}
+        self.groups = {}
+        self.posts = {}
+        self.skipped = 0
+        inputs = sorted(
+            options['inputs'], key=lambda path: KINDS.index(file_kind(path))
+        )
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['image_workers']) as self.executor, \
+                explicit_pub_date(Post, Comment):
+            for path in inputs:
+                self.import_file(path, file_kind(path))
+        self.reset_sequences()
+        # bulk_create не отправляет post_save
+        touch_posts()
+        self.stdout.write(
+            f'Импорт завершён за {time.monotonic() - started:.1f} с, '
+            f'пропущено записей: {self.skipped}'
+        )
+
+    def import_file(self, path, kind):
+        state = self.checkpoint.state(path)
+        if state['first_pk'] is None:
+            model = {'posts': Post, 'comments': Comment}.get(kind)
+            if model is not None:
+                last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+                state['first_pk'] = last + 1
+        records = read_records(path)
+        self.source = self.media_source or os.path.dirname(path)
+        position = 0
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            loaded = position < state['done']
+            getattr(self, f'import_{kind}')(
+                batch, position, state['first_pk'], loaded
+            )
+            position += len(batch)
+            if not loaded:
+                state['done'] = position
+                self.checkpoint.save()
+                self.stdout.write(f'{path}: {position}')
+
+    def reference(self, mapping, key, record):
+        """id в базе по внешнему id; None, если ссылка не найдена."""
+        value = mapping.get(str(record.get(key)))
+        if value is None and record.get(key) is not None:
+            self.stderr.write(f'Не найдена ссылка {key}={record[key]}')
+        return value
+
+    def pub_date(self, record):
+        """Дата записи; None, если её не удалось разобрать."""
+        value = record.get('pub_date')
+        if not value:
+            return timezone.now()
+        try:
+            date = parse_datetime(value)
+        except ValueError:
+            date = None
+        if date is None:
+            self.stderr.write(f'Неверная дата pub_date={value}')
+            return None
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def import_users(self, batch, position, first_pk, loaded):
+        if not loaded:
+            users = [
+                User(
+                    username=record['username'],
+                    first_name=record.get('first_name') or '',
+                    last_name=record.get('last_name') or '',
+                    email=record.get('email') or '',
+                    password=record.get('password') or make_password(None),
+                )
+                for record in batch
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users, ignore_conflicts=True)
+        # Пользователи сопоставляются по имени, в том числе уже бывшие в базе
+        pks = dict(
+            User.objects.filter(
+                username__in=[record['username'] for record in batch]
+            ).values_list('username', 'pk')
+        )
+        for record in batch:
+            external = record.get('id') or record['username']
+            self.users[str(external)] = pks[record['username']]
+
+    def import_groups(self, batch, position, first_pk, loaded):
+        if not loaded:
+            groups = [
+                Group(
+                    slug=record['slug'],
+                    title=record['title'],
+                    description=record.get('description') or '',
+                )
+                for record in batch
+            ]
+            with transaction.atomic():
+                Group.objects.bulk_create(groups, ignore_conflicts=True)
+        pks = dict(
+            Group.objects.filter(
+                slug__in=[record['slug'] for record in batch]
+            ).values_list('slug', 'pk')
+        )
+        for record in batch:
+            external = record.get('id') or record['slug']
+            self.groups[str(external)] = pks[record['slug']]
+
+    def import_posts(self, batch, position, first_pk, loaded):
+        # Запись номер N файла получает id first_pk + N, поэтому после
+        # перезапуска ссылки на уже загруженные посты восстанавливаются
+        # без обращения к базе, а повторная вставка пачки ничего не меняет.
+        # Пропущенные посты в ссылки не попадают, и комментарии к ним
+        # тоже пропускаются
+        valid = []
+        for number, record in enumerate(batch, position):
+            author = self.reference(self.users, 'author', record)
+            pub_date = self.pub_date(record)
+            if author is None or pub_date is None:
+                if not loaded:
+                    self.skipped += 1
+                continue
+            if record.get('id') is not None:
+                self.posts[str(record['id'])] = first_pk + number
+            valid.append((number, record, author, pub_date))
+        if loaded:
+            return
+        images = self.fetch_images([record for _, record, _, _ in valid])
+        posts = [
+            Post(
+                pk=first_pk + number,
+                author_id=author,
+                group_id=self.reference(self.groups, 'group', record),
+                text=record['text'],
+                pub_date=pub_date,
+                image=images.get(index) or '',
+            )
+            for index, (number, record, author, pub_date) in enumerate(valid)
+        ]
+        with transaction.atomic():
+            Post.objects.bulk_create(posts, ignore_conflicts=True)
+
+    def import_comments(self, batch, position, first_pk, loaded):
+        if loaded:
+            return
+        comments = []
+        for number, record in enumerate(batch, position):
+            post = self.reference(self.posts, 'post', record)
+            author = self.reference(self.users, 'author', record)
+            pub_date = self.pub_date(record)
+            if post is None or author is None or pub_date is None:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                pk=first_pk + number,
+                post_id=post,
+                author_id=author,
+                text=record['text'],
+                pub_date=pub_date,
+            ))
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments, ignore_conflicts=True)
+
+    def import_follows(self, batch, position, first_pk, loaded):
+        if loaded:
+            return
+        follows = []
+        for record in batch:
+            user = self.reference(self.users, 'user', record)
+            author = self.reference(self.users, 'author', record)
+            if user is None or author is None or user == author:
+                self.skipped += 1
+                continue
+            follows.append(Follow(user_id=user, author_id=author))
+        with transaction.atomic():
+            Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def fetch_images(self, batch):
+        """Загружает картинки пачки параллельно: номер записи -> имя файла."""
+        futures = {
+            index: self.executor.submit(self.fetch_image, record['image'])
+            for index, record in enumerate(batch) if record.get('image')
+        }
+        images = {}
+        for index, future in futures.items():
+            try:
+                images[index] = future.result()
+            except (OSError, ValueError) as error:
+                self.stderr.write(
+                    f"Картинка {batch[index]['image']} не загружена: {error}"
+                )
+        return images
+
+    def fetch_image(self, source):
+        url = urlparse(source)
+        if url.scheme in ('http', 'https'):
+            with urlopen(source, timeout=30) as response:
+                data = response.read()
+        else:
+            with open(os.path.join(self.source, source), 'rb') as file:
+                data = file.read()
+        field = Post._meta.get_field('image')
+        name = field.generate_filename(None, os.path.basename(url.path))
+        return field.storage.save(name, ContentFile(data))
+
+    @staticmethod
+    def reset_sequences():
+        """После вставки с явными id счётчики id должны их учитывать."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,115 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmark import summarize
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш после выкладки: рендерит первые страницы главной, '
+        'лент групп и профилей самых популярных авторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько первых страниц каждой ленты прогреть.'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=None,
+            help='Сколько групп с наибольшим числом постов, по умолчанию все.'
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=50,
+            help='Сколько профилей авторов с наибольшим числом подписчиков.'
+        )
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        urls = self.urls(
+            options['pages'], options['groups'], options['profiles']
+        )
+        self.stdout.write(
+            f"Прогрев {len(urls)} страниц в {options['workers']} потоков"
+        )
+        timings = []
+        failures = 0
+        started = time.monotonic()
+        # Панель отладки не должна попадать в кэш и влиять на замеры
+        with override_settings(DEBUG=False), \
+                ThreadPoolExecutor(options['workers']) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+            for number, future in enumerate(as_completed(futures), 1):
+                url, status, elapsed = future.result()
+                if status == 200:
+                    timings.append(elapsed)
+                else:
+                    failures += 1
+                self.stdout.write(
+                    f'[{number}/{len(urls)}] {url} {status} '
+                    f'{elapsed * 1000:.0f} ms'
+                )
+        stats = summarize(timings) if timings else None
+        self.stdout.write(
+            f'Готово за {time.monotonic() - started:.1f} с: '
+            f'{len(timings)} страниц, ошибок {failures}'
+            + (
+                f', p50 {stats["p50"] * 1000:.0f} ms, '
+                f'p95 {stats["p95"] * 1000:.0f} ms' if stats else ''
+            )
+        )
+
+    @staticmethod
+    def fetch(url):
+        started = time.perf_counter()
+        try:
+            status = Client().get(url).status_code
+        except Exception as error:
+            status = type(error).__name__
+        finally:
+            connections.close_all()
+        return url, status, time.perf_counter() - started
+
+    @staticmethod
+    def pages(url, posts_count, limit):
+        count = max(1, math.ceil(posts_count / settings.POSTS_LIMIT))
+        return [
+            f'{url}?page={page}' if page > 1 else url
+            for page in range(1, min(limit, count) + 1)
+        ]
+
+    def urls(self, pages, groups, profiles):
+        """Адреса страниц: сначала главная, затем группы и профили."""
+        urls = self.pages(reverse('posts:index'), Post.objects.count(), pages)
+        top_groups = Group.objects.annotate(
+            posts_count=Count('posts')
+        ).order_by('-posts_count')
+        for group in top_groups[:groups]:
+            urls += self.pages(
+                reverse('posts:group_list', kwargs={'slug': group.slug}),
+                group.posts_count, pages
+            )
+        top_authors = list(
+            User.objects.annotate(followers=Count('following'))
+            .order_by('-followers')[:profiles]
+        )
+        # Посты считаются отдельно, чтобы не соединять подписки с постами
+        posts_counts = dict(
+            Post.objects.filter(author__in=top_authors)
+            .values_list('author').annotate(Count('pk')).order_by()
+        )
+        for author in top_authors:
+            urls += self.pages(
+                reverse('posts:profile', kwargs={'username': author.username}),
+                posts_counts.get(author.pk, 0), pages
+            )
+        return urls
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_auto_20261019_0928'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStats',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Post', verbose_name='Запись')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотры')),
+            ],
+            options={
+                'verbose_name': 'Статистика записи',
+                'verbose_name_plural': 'Статистика записей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='poststats',
+            index=models.Index(fields=['-views'], name='post_stats_views_idx'),
+        ),
+    ]
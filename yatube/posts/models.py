@@ -68,6 +68,18 @@ class Post(PubDateModel):
         ordering = (
             '-pub_date',
         )
+        # Индексы под сортировку лент: без полного просмотра и сортировки
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TEXT_LIMIT]
@@ -99,6 +111,12 @@ class Comment(PubDateModel):
         ordering = (
             '-pub_date',
         )
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date'],
+                name='comment_post_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TEXT_LIMIT]
@@ -131,3 +149,79 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"{self.user} подписан на {self.author}"
+
+
+class PostStats(models.Model):
+    """Счётчики поста, которые копятся в памяти и пишутся пачками."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Запись'
+    )
+    views = models.PositiveIntegerField('Просмотры', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика записи'
+        verbose_name_plural = 'Статистика записей'
+        indexes = [
+            models.Index(fields=['-views'], name='post_stats_views_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.views}'
+
+
+class Like(models.Model):
+    """Отметка «нравится» пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Запись'
+    )
+
+    class Meta:
+        verbose_name = 'Отметка «нравится»'
+        verbose_name_plural = 'Отметки «нравится»'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_like',
+                fields=['user', 'post'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} отметил {self.post_id}'
+
+
+class PostLikeShard(models.Model):
+    """Часть счётчика отметок поста: сумма по шардам - число отметок."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_shards',
+        verbose_name='Запись'
+    )
+    shard = models.PositiveSmallIntegerField('Шард')
+    count = models.IntegerField('Отметок', default=0)
+
+    class Meta:
+        verbose_name = 'Шард счётчика отметок'
+        verbose_name_plural = 'Шарды счётчиков отметок'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_like_shard',
+                fields=['post', 'shard'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}/{self.shard}: {self.count}'
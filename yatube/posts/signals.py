@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.middleware.coalescing import response_shared
+
+from .counters import views
+from .func import touch_posts
+from .live import publish_post
+from .models import Post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_posts(sender, **kwargs):
+    """Изменение поста сбрасывает кэш и ETag лент и API."""
+    touch_posts()
+
+
+@receiver(post_save, sender=Post)
+def announce_post(sender, instance, created, **kwargs):
+    """Новый пост объявляется в живые ленты после коммита."""
+    if created:
+        transaction.on_commit(lambda: publish_post(instance))
+
+
+@receiver(response_shared)
+def count_shared_view(sender, match, **kwargs):
+    """
+    Просмотр поста, отданный копией ответа другого запроса, до
+    post_detail не доходит - учитываем его здесь.
+    """
+    if match.view_name == 'posts:post_detail':
+        views.hit(match.kwargs['post_id'])
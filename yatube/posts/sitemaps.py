@@ -0,0 +1,238 @@
+"""
+Статические sitemap-файлы, разбитые на шарды.
+
+Адреса постов, профилей и групп делятся на шарды по диапазонам id
+(поста, автора или группы) по SITEMAP_SHARD_SIZE штук. Для каждого шарда
+одним агрегирующим запросом считается отпечаток: число записей и дата
+последнего поста. Перегенерируются только шарды, отпечаток которых
+изменился с прошлого запуска (manifest.json). Записи шарда читаются
+курсором, а файлы пишутся сразу в двух видах - .xml и .xml.gz для
+раздачи веб-сервером без сжатия на лету.
+"""
+import abc
+import gzip
+import json
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, Max
+from django.db.models.functions import Cast
+from django.urls import reverse
+
+from .models import Post
+
+MANIFEST = 'manifest.json'
+INDEX = 'sitemap.xml'
+
+URLSET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+URLSET_FOOTER = '</urlset>\n'
+INDEX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+INDEX_FOOTER = '</sitemapindex>\n'
+
+
+def shard_of(field):
+    """Номер шарда по id: id 1..SIZE - шард 0 и т.д."""
+    return Cast(
+        (F(field) - 1) / settings.SITEMAP_SHARD_SIZE,
+        output_field=IntegerField()
+    )
+
+
+def shard_range(shard):
+    size = settings.SITEMAP_SHARD_SIZE
+    return shard * size + 1, (shard + 1) * size
+
+
+class Section(abc.ABC):
+    """Раздел sitemap: адреса одного вида, шардированные по id поля."""
+    name = None
+    field = None
+
+    def queryset(self):
+        return Post.objects.all()
+
+    def fingerprints(self):
+        """Отпечатки всех шардов одним запросом: {шард: [число, дата]}."""
+        rows = (
+            self.queryset().annotate(shard=shard_of(self.field))
+            .values('shard').order_by('shard')
+            .annotate(count=Count(self.field, distinct=True),
+                      last=Max('pub_date'))
+        )
+        return {
+            row['shard']: [row['count'], row['last'].isoformat()]
+            for row in rows
+        }
+
+    def in_shard(self, queryset, shard):
+        start, stop = shard_range(shard)
+        # У внешних ключей в Django 2.2 нет lookup-а range
+        return queryset.filter(**{
+            f'{self.field}__gte': start, f'{self.field}__lte': stop
+        })
+
+    @abc.abstractmethod
+    def entries(self, shard):
+        """Адрес и дата последнего изменения для записей шарда."""
+
+
+class PostsSection(Section):
+    name = 'posts'
+    field = 'pk'
+
+    def entries(self, shard):
+        rows = (
+            self.in_shard(Post.objects, shard).order_by('pk')
+            .values_list('pk', 'pub_date')
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        for pk, pub_date in rows:
+            yield reverse('posts:post_detail', args=[pk]), pub_date
+
+
+class ProfilesSection(Section):
+    name = 'profiles'
+    field = 'author'
+
+    def entries(self, shard):
+        rows = (
+            self.in_shard(Post.objects, shard)
+            .values('author_id', 'author__username').order_by('author_id')
+            .annotate(last=Max('pub_date'))
+            .values_list('author__username', 'last')
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        for username, last in rows:
+            yield reverse('posts:profile', args=[username]), last
+
+
+class GroupsSection(Section):
+    name = 'groups'
+    field = 'group'
+
+    def queryset(self):
+        return Post.objects.filter(group__isnull=False)
+
+    def entries(self, shard):
+        rows = (
+            self.in_shard(Post.objects, shard)
+            .values('group_id', 'group__slug').order_by('group_id')
+            .annotate(last=Max('pub_date'))
+            .values_list('group__slug', 'last')
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        for slug, last in rows:
+            yield reverse('posts:group_list', args=[slug]), last
+
+
+SECTIONS = (PostsSection(), ProfilesSection(), GroupsSection())
+
+
+class SitemapWriter:
+    """Пишет файл одновременно в .xml и .xml.gz с атомарной заменой."""
+
+    def __init__(self, directory, filename):
+        self.directory = directory
+        self.filename = filename
+
+    def __enter__(self):
+        self.files = []
+        for suffix in ('', '.gz'):
+            fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            raw = os.fdopen(fd, 'wb')
+            stream = gzip.GzipFile(
+                self.filename, 'wb', fileobj=raw, mtime=0
+            ) if suffix else raw
+            self.files.append((stream, raw, path, self.filename + suffix))
+        return self
+
+    def write(self, text):
+        data = text.encode()
+        for stream, _, _, _ in self.files:
+            stream.write(data)
+
+    def __exit__(self, exc_type, exc, traceback):
+        for stream, raw, path, filename in self.files:
+            stream.close()
+            raw.close()
+            if exc_type is None:
+                os.replace(path, os.path.join(self.directory, filename))
+            else:
+                os.unlink(path)
+
+
+def shard_filename(section, shard):
+    return f'{section.name}-{shard:04}.xml'
+
+
+def write_shard(directory, base_url, section, shard):
+    with SitemapWriter(directory, shard_filename(section, shard)) as file:
+        file.write(URLSET_HEADER)
+        for path, lastmod in section.entries(shard):
+            file.write(
+                f'<url><loc>{escape(base_url + path)}</loc>'
+                f'<lastmod>{lastmod.isoformat()}</lastmod></url>\n'
+            )
+        file.write(URLSET_FOOTER)
+
+
+def write_index(directory, base_url, manifest):
+    with SitemapWriter(directory, INDEX) as file:
+        file.write(INDEX_HEADER)
+        for filename, (_, lastmod) in sorted(manifest.items()):
+            file.write(
+                f'<sitemap><loc>{escape(base_url + filename)}</loc>'
+                f'<lastmod>{lastmod}</lastmod></sitemap>\n'
+            )
+        file.write(INDEX_FOOTER)
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(directory, manifest):
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path, os.path.join(directory, MANIFEST))
+
+
+def generate(directory, base_url, force=False):
+    """
+    Обновляет sitemap в directory. base_url - адрес сайта без
+    завершающего слэша. Возвращает (перегенерировано, всего) шардов.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = {} if force else load_manifest(directory)
+    manifest = {}
+    regenerated = 0
+    for section in SECTIONS:
+        for shard, fingerprint in section.fingerprints().items():
+            filename = shard_filename(section, shard)
+            manifest[filename] = fingerprint
+            exists = os.path.exists(os.path.join(directory, filename))
+            if previous.get(filename) != fingerprint or not exists:
+                write_shard(directory, base_url, section, shard)
+                regenerated += 1
+    for filename in set(previous) - set(manifest):
+        for suffix in ('', '.gz'):
+            path = os.path.join(directory, filename + suffix)
+            if os.path.exists(path):
+                os.unlink(path)
+    shards_url = base_url + settings.SITEMAP_URL
+    write_index(directory, shards_url, manifest)
+    save_manifest(directory, manifest)
+    return regenerated, len(manifest)
@@ -0,0 +1,66 @@
+import re
+
+from django import template
+from django.contrib.auth.models import AnonymousUser
+from django.utils.safestring import mark_safe
+
+from .. import likes
+from ..func import more_url as build_more_url
+
+register = template.Library()
+
+LIKE_PLACEHOLDER = '<!--like:{}-->'
+LIKE_PATTERN = re.compile(r'<!--like:(\d+)-->')
+
+
+@register.simple_tag
+def more_url(url_name, post, *args):
+    """Адрес следующей порции ленты после поста post."""
+    return build_more_url(url_name, args, post.pub_date, post.pk)
+
+
+@register.simple_tag
+def like(post):
+    """
+    Место кнопки «нравится» поста. Кнопку вставляет {% likes %} уже
+    после кэша фрагментов, поэтому закэшированная лента общая для всех.
+    """
+    return mark_safe(LIKE_PLACEHOLDER.format(post.pk))
+
+
+class LikesNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        content = self.nodelist.render(context)
+        post_ids = list(dict.fromkeys(
+            int(pk) for pk in LIKE_PATTERN.findall(content)
+        ))
+        if not post_ids:
+            return content
+        user = context.get('user') or AnonymousUser()
+        counts = likes.like_counts(post_ids)
+        liked = likes.liked_posts(user, post_ids)
+        button = context.template.engine.get_template('includes/like.html')
+
+        def render_button(match):
+            post_id = int(match.group(1))
+            with context.push(post_id=post_id, likes_count=counts[post_id],
+                              liked=post_id in liked):
+                return button.render(context)
+
+        return mark_safe(LIKE_PATTERN.sub(render_button, content))
+
+
+@register.tag('likes')
+def likes_tag(parser, token):
+    """
+    {% likes %}...{% endlikes %}: заменяет места из {% like post %}
+    кнопками с числом отметок и отметкой пользователя - для всех постов
+    разом, одним запросом счётчиков (если их нет в кэше) и одним запросом
+    отметок пользователя.
+    """
+    nodelist = parser.parse(('endlikes',))
+    parser.delete_first_token()
+    return LikesNode(nodelist)
@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db.models import Count, Max
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.loadtest import SMALL_GIF
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class GenerateDataCommandTests(TestCase):
+    """Тесты генератора данных и замера представлений."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data',
+            users=20, groups=3, posts=200, comments=300, follows=40,
+            batch_size=50, seed=1, stdout=StringIO(),
+        )
+
+    def test_data_generated(self):
+        """Создано заданное количество записей."""
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertLessEqual(Follow.objects.count(), 40)
+        self.assertGreater(Follow.objects.count(), 0)
+
+    def test_data_is_skewed(self):
+        """Посты и комментарии распределены неравномерно."""
+        most_posts = User.objects.annotate(
+            posts_count=Count('posts')
+        ).aggregate(most=Max('posts_count'))['most']
+        self.assertGreater(most_posts, 200 / 20 * 2)
+        longest_thread = Post.objects.annotate(
+            comments_count=Count('comments')
+        ).aggregate(most=Max('comments_count'))['most']
+        self.assertGreater(longest_thread, 300 / 200 * 10)
+
+    def test_pub_dates_spread(self):
+        """Даты публикаций распределены по периоду."""
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater((max(dates) - min(dates)).days, 30)
+
+    def test_benchmark_reports_read_only_pages(self):
+        """Замер выводит p50/p95 и число запросов для GET-страниц."""
+        out = StringIO()
+        call_command(
+            'benchmark_views', iterations=2, warmup=0, stdout=out
+        )
+        for name in (
+            'posts:index', 'posts:group_list', 'posts:profile',
+            'posts:post_detail', 'posts:post_create', 'posts:post_edit',
+            'posts:follow_index', 'posts:profile_export',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, out.getvalue())
+        for name in (
+            'posts:index_events', 'posts:follow_events', 'posts:post_like',
+            'posts:add_comment', 'posts:profile_follow',
+        ):
+            with self.subTest(name=name):
+                self.assertNotIn(f'{name} ', out.getvalue())
+
+
+class WarmupCacheCommandTests(TransactionTestCase):
+    """Тесты прогрева кэша."""
+
+    def setUp(self):
+        call_command(
+            'generate_data',
+            users=10, groups=2, posts=50, comments=0, follows=20,
+            batch_size=50, seed=1, stdout=StringIO(),
+        )
+        cache.clear()
+
+    def test_warmup_fills_cache(self):
+        """Первые страницы лент отрендерены и закэшированы."""
+        out = StringIO()
+        call_command(
+            'warmup_cache', pages=2, profiles=3, workers=2, stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn(reverse('posts:index') + '?page=2', output)
+        for group in Group.objects.all():
+            with self.subTest(group=group.slug):
+                self.assertIn(
+                    reverse('posts:group_list', kwargs={'slug': group.slug}),
+                    output
+                )
+        self.assertIn('ошибок 0', output)
+        self.assertIsNotNone(
+            cache.get(
+                make_template_fragment_key('index_page', [1])
+            )
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportContentCommandTests(TestCase):
+    """Тесты потокового импорта."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        with open(os.path.join(self.directory, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        self.write('users.jsonl', [
+            {'id': 1, 'username': 'leo', 'first_name': 'Лев'},
+            {'id': 2, 'username': 'anna'},
+        ])
+        self.write('groups.csv', [
+            {'id': 'g', 'slug': 'novels', 'title': 'Романы'},
+        ])
+        self.write('posts.jsonl', [
+            {
+                'id': f'p{number}', 'author': 1 + number % 2,
+                'group': 'g' if number % 2 else None,
+                'text': f'Пост {number}',
+                'pub_date': f'1869-01-{number + 1:02}T12:00:00',
+                'image': 'small.gif' if number == 0 else None,
+            }
+            for number in range(5)
+        ] + [
+            {'id': 'lost', 'author': 99, 'text': 'Без автора'},
+            {
+                'id': 'undated', 'author': 1, 'text': 'Без даты',
+                'pub_date': 'вчера',
+            },
+            {'author': 1, 'text': 'Нет дня', 'pub_date': '1869-02-30'},
+        ])
+        self.write('comments.jsonl', [
+            {'post': 'p4', 'author': 2, 'text': 'Комментарий'},
+            {'post': 'undated', 'author': 2, 'text': 'К пропущенному'},
+        ])
+        self.write('follows.csv', [{'user': 2, 'author': 1}])
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.json')
+
+    def write(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            if name.endswith('.csv'):
+                writer = csv.DictWriter(file, fieldnames=list(records[0]))
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                for record in records:
+                    file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def run_import(self):
+        names = (
+            'posts.jsonl', 'comments.jsonl', 'users.jsonl', 'groups.csv',
+            'follows.csv',
+        )
+        call_command(
+            'import_content',
+            *(os.path.join(self.directory, name) for name in names),
+            batch_size=2, checkpoint=self.checkpoint,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_import(self):
+        """Записи созданы, ссылки и даты сохранены, картинка загружена."""
+        self.run_import()
+        self.assertEqual(User.objects.count(), 2)
+        # Записи без автора и с неверной датой пропущены, как и
+        # комментарии к пропущенным постам
+        self.assertEqual(Post.objects.count(), 5)
+        post = Post.objects.get(text='Пост 4')
+        self.assertEqual(post.author.username, 'leo')
+        self.assertEqual(post.pub_date.year, 1869)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(
+            Post.objects.get(text='Пост 3').group.slug, 'novels'
+        )
+        self.assertTrue(
+            Post.objects.get(text='Пост 0').image.name.startswith('posts/')
+        )
+        self.assertTrue(Follow.objects.filter(
+            user__username='anna', author__username='leo'
+        ).exists())
+
+    def test_resume(self):
+        """Повторный запуск продолжает с контрольной точки без дублей."""
+        self.run_import()
+        # Импорт прервался после первой пачки постов
+        with open(self.checkpoint) as file:
+            state = json.load(file)
+        for path in state:
+            if path.endswith('posts.jsonl'):
+                state[path]['done'] = 2
+            elif path.endswith(('comments.jsonl', 'follows.csv')):
+                state[path]['done'] = 0
+        with open(self.checkpoint, 'w') as file:
+            json.dump(state, file)
+        Post.objects.filter(text__in=('Пост 3', 'Пост 4')).delete()
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.get().post.text, 'Пост 4')
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.middleware.coalescing import RequestCoalescingMiddleware
+
+from .. import counters
+from ..models import Post, PostStats, User
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+class ViewCounterTests(TransactionTestCase):
+    """Тесты счётчиков просмотров."""
+
+    def setUp(self):
+        cache.clear()
+        counters.views.flush()
+        self.author = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def visit(self, post, times):
+        for _ in range(times):
+            self.client.get(reverse('posts:post_detail', args=[post.pk]))
+
+    def test_views_flushed_in_one_update(self):
+        """Просмотры копятся в памяти и пишутся одним UPDATE."""
+        self.visit(self.posts[0], 3)
+        self.visit(self.posts[1], 1)
+        self.assertFalse(PostStats.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            counters.views.flush()
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0]['sql'])
+        self.visit(self.posts[0], 2)
+        counters.views.flush()
+        self.assertEqual(
+            dict(PostStats.objects.values_list('post_id', 'views')),
+            {self.posts[0].pk: 5, self.posts[1].pk: 1}
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.posts[0].pk])
+        )
+        self.assertContains(response, 'Просмотров: 5')
+
+    def test_coalesced_views_counted(self):
+        """Просмотры, отданные копией ответа другого запроса, учитываются."""
+        def slow_view(request):
+            time.sleep(0.2)
+            return HttpResponse('post')
+
+        middleware = RequestCoalescingMiddleware(slow_view)
+        url = reverse('posts:post_detail', args=[self.posts[0].pk])
+        threads = []
+        for _ in range(3):
+            request = RequestFactory().get(url)
+            request.user = AnonymousUser()
+            threads.append(threading.Thread(target=middleware, args=[request]))
+            threads[-1].start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        # Ведущий прошёл мимо post_detail, двое получили его копию
+        self.assertEqual(counters.views.deltas[self.posts[0].pk], 2)
+
+    def test_deleted_post(self):
+        self.visit(self.posts[0], 1)
+        self.posts[0].delete()
+        self.assertEqual(counters.views.flush(), 1)
+        self.assertFalse(PostStats.objects.exists())
+
+    def test_popular(self):
+        """Популярное - по убыванию просмотров, без непросмотренных."""
+        self.visit(self.posts[0], 1)
+        self.visit(self.posts[2], 2)
+        counters.views.flush()
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.posts[2], self.posts[0]]
+        )
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, EXPORT_CHUNK_SIZE=2)
+class ExportViewsTests(TestCase):
+    """Тесты потоковой выгрузки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+        cls.posts[0].image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif'
+        )
+        cls.posts[0].save()
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.author, text='Свой комментарий'
+        )
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.reader, text='Чужой комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def export(self, client, name, output, **kwargs):
+        response = client.get(
+            reverse(name, kwargs=kwargs), {'format': output}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_jsonl(self):
+        """Выгрузка автора: его посты и его комментарии."""
+        content = self.export(
+            self.author_client, 'posts:profile_export', 'jsonl',
+            username=self.author.username,
+        )
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records], ['post'] * 5 + ['comment']
+        )
+        self.assertEqual(records[-1]['text'], 'Свой комментарий')
+        self.assertEqual(records[0]['author'], 'author')
+        self.assertEqual(records[0]['group'], 'test-slug')
+
+    def test_csv(self):
+        content = self.export(
+            self.author_client, 'posts:profile_export', 'csv',
+            username=self.author.username,
+        )
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            {row['text'] for row in rows if row['type'] == 'post'},
+            {post.text for post in self.posts}
+        )
+
+    def test_zip_includes_images(self):
+        """Архив группы: посты, все комментарии к ним и картинки."""
+        client = Client()
+        client.force_login(self.admin)
+        content = self.export(
+            client, 'posts:group_export', 'zip', slug=self.group.slug
+        )
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.namelist(), [
+                'posts.jsonl', 'comments.jsonl', self.posts[0].image.name
+            ])
+            self.assertEqual(
+                archive.read(self.posts[0].image.name), SMALL_GIF
+            )
+            comments = archive.read('comments.jsonl').decode().splitlines()
+        self.assertEqual(len(comments), 2)
+
+    def test_permissions(self):
+        """Чужие данные и группы выгружают только админы."""
+        client = Client()
+        client.force_login(self.reader)
+        urls = (
+            reverse('posts:profile_export', args=[self.author.username]),
+            reverse('posts:group_export', args=[self.group.slug]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code, 403)
+
+    def test_unknown_format(self):
+        response = self.author_client.get(
+            reverse('posts:profile_export', args=[self.author.username]),
+            {'format': 'xml'}
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class FeedsTests(TestCase):
+    """Тесты RSS/Atom лент."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Другое описание',
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе'
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.other_group, text='Пост в другой'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """Ленты главной, группы и автора в обоих форматах."""
+        cases = (
+            ('posts:index_feed', {}, {'Пост в группе', 'Пост в другой'}),
+            ('posts:group_feed', {'slug': 'test-slug'}, {'Пост в группе'}),
+            ('posts:profile_feed', {'username': 'author'},
+             {'Пост в группе', 'Пост в другой'}),
+        )
+        for name, kwargs, texts in cases:
+            for feed_format, content_type in (
+                    ('rss', 'application/rss+xml'),
+                    ('atom', 'application/atom+xml')):
+                with self.subTest(name=name, feed_format=feed_format):
+                    response = self.client.get(reverse(
+                        name, kwargs=dict(kwargs, feed_format=feed_format)
+                    ))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    content = response.content.decode()
+                    for text in {'Пост в группе', 'Пост в другой'}:
+                        self.assertEqual(text in content, text in texts)
+
+    def test_pagination(self):
+        """Элементы ленты - страница постов, как в HTML-ленте."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Старый пост {number}')
+            for number in range(settings.POSTS_LIMIT)
+        )
+        url = reverse('posts:index_feed', args=['rss'])
+        self.assertEqual(
+            self.client.get(url).content.count(b'<item>'),
+            settings.POSTS_LIMIT
+        )
+        self.assertEqual(
+            self.client.get(url, {'page': 2}).content.count(b'<item>'), 2
+        )
+
+    def test_conditional_get(self):
+        """Без изменений постов лента отдаётся из кэша или как 304."""
+        url = reverse('posts:index_feed', args=['rss'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                304
+            )
+            self.assertEqual(
+                self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                ).status_code,
+                304
+            )
+            self.assertEqual(self.client.get(url).content, response.content)
+
+    def test_invalidation(self):
+        """Сохранение поста меняет ETag и содержимое ленты."""
+        url = reverse('posts:index_feed', args=['rss'])
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Свежий пост', response.content.decode())
+
+    def test_not_found(self):
+        for url in (
+            reverse('posts:index_feed', args=['xml']),
+            reverse('posts:group_feed', args=['missing', 'rss']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,145 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import likes
+from ..models import Like, Post, PostLikeShard, User
+
+
+class LikesTests(TestCase):
+    """Тесты отметок «нравится»."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(20)
+        ]
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        cls.post = cls.posts[0]
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(LIKE_SHARDS=4)
+    def test_sharded_counter(self):
+        """Отметки расходятся по шардам, сумма шардов - число отметок."""
+        for user in self.users:
+            self.assertTrue(likes.like(user, self.post.pk))
+        self.assertFalse(likes.like(self.users[0], self.post.pk))
+        self.assertTrue(likes.unlike(self.users[1], self.post.pk))
+        self.assertFalse(likes.unlike(self.users[1], self.post.pk))
+        shards = PostLikeShard.objects.filter(post=self.post)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertGreater(shards.count(), 1)
+        self.assertEqual(shards.aggregate(total=Sum('count'))['total'], 19)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 19)
+        self.assertEqual(likes.like_counts([self.post.pk]), {self.post.pk: 19})
+
+    def test_page_lookup_is_batched(self):
+        """Счётчики и отметки страницы - по запросу, счётчики кэшируются."""
+        user = self.users[0]
+        likes.like(user, self.posts[1].pk)
+        likes.like(self.users[1], self.posts[1].pk)
+        post_ids = [post.pk for post in self.posts]
+        with self.assertNumQueries(2):
+            counts = likes.like_counts(post_ids)
+            liked = likes.liked_posts(user, post_ids)
+        self.assertEqual(
+            [(counts[pk], pk in liked) for pk in post_ids],
+            [(0, False), (2, True), (0, False)]
+        )
+        with self.assertNumQueries(1):
+            likes.like_counts(post_ids)
+            likes.liked_posts(user, post_ids)
+        with self.assertNumQueries(0):
+            likes.liked_posts(AnonymousUser(), post_ids)
+        likes.unlike(user, self.posts[1].pk)
+        self.assertEqual(likes.like_counts(post_ids)[self.posts[1].pk], 1)
+        self.assertNotIn(self.posts[1].pk, likes.liked_posts(user, post_ids))
+
+    def test_count_read_during_like_is_not_cached(self):
+        """Сумма, прочитанная до отметки, не остаётся в кэше после неё."""
+        set_many = cache.set_many
+
+        def like_then_set_many(*args, **kwargs):
+            # Отметка успевает между чтением шардов и записью в кэш
+            likes.like(self.users[0], self.post.pk)
+            set_many(*args, **kwargs)
+
+        with mock.patch.object(
+                cache, 'set_many', side_effect=like_then_set_many):
+            counts = likes.like_counts([self.post.pk])
+        self.assertEqual(counts, {self.post.pk: 0})
+        self.assertEqual(likes.like_counts([self.post.pk]), {self.post.pk: 1})
+
+    def test_cached_page_shows_own_likes(self):
+        """
+        Закэшированная лента общая, но кнопки у каждого пользователя
+        свои, и фрагмент ленты не отдаётся из браузерного кэша.
+        """
+        likes.like(self.users[0], self.post.pk)
+        like_url = reverse('posts:post_like', args=[self.post.pk])
+        unlike_url = reverse('posts:post_unlike', args=[self.post.pk])
+        self.client.get(reverse('posts:index'))
+        self.assertIsNotNone(
+            cache.get(make_template_fragment_key('index_page', [1]))
+        )
+        for user, liked in ((self.users[0], True), (self.users[1], False)):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                response = self.client.get(reverse('posts:index'))
+                self.assertContains(response, '♥ 1')
+                self.assertEqual(unlike_url in response.content.decode(),
+                                 liked)
+                self.assertEqual(like_url in response.content.decode(),
+                                 not liked)
+        response = self.client.get(reverse('posts:index_more'))
+        self.assertContains(response, like_url)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_like_views(self):
+        """Отметка видна в ленте сразу, несмотря на кэш страницы."""
+        self.client.force_login(self.users[0])
+        index = reverse('posts:index')
+        self.assertContains(self.client.get(index), '♥ 0', count=3)
+        response = self.client.post(
+            reverse('posts:post_like', args=[self.post.pk]),
+            HTTP_REFERER='http://testserver' + index
+        )
+        self.assertRedirects(response, 'http://testserver' + index)
+        content = self.client.get(index).content.decode()
+        self.assertEqual(content.count('♥ 1'), 1)
+        self.assertIn(reverse('posts:post_unlike', args=[self.post.pk]),
+                      content)
+        response = self.client.post(
+            reverse('posts:post_unlike', args=[self.post.pk]),
+            HTTP_REFERER='http://evil.example/'
+        )
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertFalse(Like.objects.exists())
+        cases = (
+            (self.client.get(
+                reverse('posts:post_like', args=[self.post.pk])), 405),
+            (self.client.post(reverse('posts:post_like', args=[0])), 404),
+        )
+        for response, status in cases:
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+        self.client.logout()
+        response = self.client.post(
+            reverse('posts:post_like', args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Like.objects.exists())
@@ -0,0 +1,136 @@
+import os
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import live
+from ..models import Follow, Post, User
+
+EVENTS_DIR = tempfile.TemporaryDirectory()
+
+
+@override_settings(
+    LIVE_EVENTS=True,
+    LIVE_EVENTS_FILE=os.path.join(EVENTS_DIR.name, 'events'),
+    LIVE_POLL_INTERVAL=0.01,
+    LIVE_HEARTBEAT=0.1,
+    LIVE_MAX_AGE=1,
+)
+class LiveTests(TransactionTestCase):
+    """Тесты уведомлений о новых постах."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        EVENTS_DIR.cleanup()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def events(self, url, create=(), **extra):
+        """
+        Открывает поток событий, публикует посты авторов create и
+        возвращает id постов из событий до закрытия потока.
+        """
+        response = self.client.get(url, **extra)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry:'))
+        for author in create:
+            Post.objects.create(author=author, text='Новый пост')
+        ids = [
+            int(line[len(b'data: '):])
+            for chunk in stream for line in chunk.splitlines()
+            if line.startswith(b'data: ')
+        ]
+        response.close()
+        return ids
+
+    def test_index_events(self):
+        """Лента получает id всех новых постов."""
+        ids = self.events(
+            reverse('posts:index_events'), create=(self.author, self.other)
+        )
+        self.assertEqual(
+            ids, list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        )
+
+    def test_follow_events(self):
+        """Лента подписок получает только посты избранных авторов."""
+        self.client.force_login(self.reader)
+        ids = self.events(
+            reverse('posts:follow_events'), create=(self.other, self.author)
+        )
+        self.assertEqual(
+            ids, [Post.objects.get(author=self.author).pk]
+        )
+
+    def test_missed_posts(self):
+        """После переподключения досылаются пропущенные посты."""
+        first = Post.objects.create(author=self.author, text='Первый')
+        second = Post.objects.create(author=self.author, text='Второй')
+        url = reverse('posts:index_events')
+        self.assertEqual(
+            self.events(url, HTTP_LAST_EVENT_ID=str(first.pk)), [second.pk]
+        )
+        self.assertEqual(
+            self.events(f'{url}?after={first.pk - 1}'), [first.pk, second.pk]
+        )
+
+    @override_settings(POSTS_LIMIT=2)
+    def test_newest_missed_posts(self):
+        """Из пропущенных сверх POSTS_LIMIT досылаются самые новые."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(4)
+        ]
+        ids = self.events(
+            reverse('posts:index_events'), HTTP_LAST_EVENT_ID=str(0)
+        )
+        self.assertEqual(ids, [posts[2].pk, posts[3].pk])
+
+    @override_settings(LIVE_MAX_STREAMS=1)
+    def test_streams_limit(self):
+        """Сверх LIVE_MAX_STREAMS потоков - 503 с паузой переподключения."""
+        url = reverse('posts:index_events')
+        first = self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.content.startswith(b'retry:'))
+        self.assertIn('Retry-After', response)
+        # Закрытый, даже не прочитанный поток освобождает место
+        first.close()
+        second = self.client.get(url)
+        self.assertEqual(second.status_code, 200)
+        second.close()
+        self.assertEqual(live.slots.count, 0)
+
+    @override_settings(LIVE_EVENTS=False)
+    def test_disabled(self):
+        """Без LIVE_EVENTS потоков и их разметки на странице нет."""
+        response = self.client.get(reverse('posts:index_events'))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'data-events')
+
+    def test_post_cards(self):
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        # Посты и число их отметок «нравится»
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:post_cards'),
+                {'ids': f'{posts[0].pk},{posts[2].pk}'}
+            )
+        content = response.content.decode()
+        self.assertIn('Пост 0', content)
+        self.assertNotIn('Пост 1', content)
+        self.assertLess(content.index('Пост 2'), content.index('Пост 0'))
+        response = self.client.get(reverse('posts:post_cards'), {'ids': 'x'})
+        self.assertEqual(response.status_code, 400)
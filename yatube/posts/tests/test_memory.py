@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+from core.testing import MemoryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post, User
+
+# Худший случай: длинные посты и длинная ветка комментариев
+LONG_TEXT = 'Очень длинный пост. ' * 1000
+COMMENTS_COUNT = 2000
+
+
+class MemoryBudgetTests(MemoryBudgetMixin, TestCase):
+    """Пик памяти при рендеринге тяжёлых страниц не превышает бюджет."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=LONG_TEXT)
+            for _ in range(settings.POSTS_LIMIT * 2)
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Обсуждаемый пост'
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=cls.user,
+                text=f'Комментарий {number}. ' * 10,
+            )
+            for number in range(COMMENTS_COUNT)
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_all_budgets_checked(self):
+        """Для каждой страницы с бюджетом есть проверка."""
+        self.assertEqual(set(settings.MEMORY_BUDGETS), {
+            'posts:index', 'posts:group_list', 'posts:profile',
+            'posts:post_detail', 'posts:follow_index',
+        })
+
+    def test_index(self):
+        self.assertMemoryBudget('posts:index', self.authorized_client)
+
+    def test_group_list(self):
+        self.assertMemoryBudget(
+            'posts:group_list', self.authorized_client,
+            kwargs={'slug': self.group.slug},
+        )
+
+    def test_profile(self):
+        self.assertMemoryBudget(
+            'posts:profile', self.authorized_client,
+            kwargs={'username': self.author.username},
+        )
+
+    def test_post_detail(self):
+        self.assertMemoryBudget(
+            'posts:post_detail', self.authorized_client,
+            kwargs={'post_id': self.post.id},
+        )
+
+    def test_follow_index(self):
+        self.assertMemoryBudget('posts:follow_index', self.authorized_client)
+
+    @override_settings(MEMORY_BUDGETS={'posts:index': 1024})
+    def test_budget_exceeded(self):
+        """Превышение бюджета роняет тест."""
+        with self.assertRaises(AssertionError):
+            self.assertMemoryBudget('posts:index', self.authorized_client)
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.test import Client, TestCase
+
+from core.testing import QueryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post, PostStats, User
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов к базе не зависит от количества постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с комментариями',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def grow_posts(self, author=None, follow=False):
+        """Каждый новый пост - от нового автора, чтобы поймать N+1."""
+        def grow(size):
+            while Post.objects.count() < size:
+                number = Post.objects.count()
+                post_author = author or User.objects.create_user(
+                    username=f'author{number}'
+                )
+                if follow:
+                    Follow.objects.get_or_create(
+                        user=self.user, author=post_author
+                    )
+                Post.objects.create(
+                    author=post_author,
+                    text=f'Пост {number}',
+                    group=self.group,
+                )
+        return grow
+
+    def grow_comments(self, size):
+        while self.post.comments.count() < size:
+            number = self.post.comments.count()
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'commenter{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def test_all_budgets_checked(self):
+        """Для каждой страницы с бюджетом есть проверка."""
+        self.assertEqual(set(settings.QUERY_BUDGETS), {
+            'posts:index', 'posts:group_list', 'posts:profile',
+            'posts:post_detail', 'posts:follow_index', 'posts:popular',
+        })
+
+    def test_index(self):
+        self.assertQueryBudget(
+            'posts:index', self.grow_posts(), self.authorized_client
+        )
+
+    def test_group_list(self):
+        self.assertQueryBudget(
+            'posts:group_list', self.grow_posts(), self.authorized_client,
+            kwargs={'slug': self.group.slug},
+        )
+
+    def test_profile(self):
+        self.assertQueryBudget(
+            'posts:profile', self.grow_posts(author=self.author),
+            self.authorized_client,
+            kwargs={'username': self.author.username},
+        )
+
+    def test_post_detail(self):
+        self.assertQueryBudget(
+            'posts:post_detail', self.grow_comments, self.authorized_client,
+            kwargs={'post_id': self.post.id},
+        )
+
+    def test_follow_index(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertQueryBudget(
+            'posts:follow_index', self.grow_posts(follow=True),
+            self.authorized_client,
+        )
+
+    def test_popular(self):
+        grow = self.grow_posts()
+
+        def grow_viewed(size):
+            grow(size)
+            for post in Post.objects.filter(stats__isnull=True):
+                PostStats.objects.create(post=post, views=post.pk)
+
+        self.assertQueryBudget(
+            'posts:popular', grow_viewed, self.authorized_client
+        )
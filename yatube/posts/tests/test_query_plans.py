@@ -0,0 +1,68 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryPlanMixin
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Запросы лент и комментариев используют индексы без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_index(self):
+        self.assertViewQueryPlan(
+            reverse('posts:index'), 'posts_post', 'post_pub_date_idx'
+        )
+
+    def test_group_list(self):
+        self.assertViewQueryPlan(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            'posts_post', 'post_group_pub_date_idx'
+        )
+
+    def test_profile(self):
+        self.assertViewQueryPlan(
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            'posts_post', 'post_author_pub_date_idx'
+        )
+
+    def test_follow_index(self):
+        # Посты подписок читаются по индексам автора, сортируются только
+        # они; какой из двух индексов автора взять, SQLite решает сам
+        self.assertViewQueryPlan(
+            reverse('posts:follow_index'), 'posts_post',
+            ('post_author_pub_date_idx', 'posts_post_author_id_fe5487bf'),
+            client=self.authorized_client, sort=True,
+        )
+
+    def test_comments(self):
+        self.assertViewQueryPlan(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            'posts_comment', 'comment_post_pub_date_idx'
+        )
@@ -0,0 +1,101 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import sitemaps
+from ..models import Group, Post, User
+
+BASE_URL = 'https://yatube.test'
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2)
+class SitemapsTests(TestCase):
+    """Тесты шардированных sitemap-файлов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.authors[number % 3], group=cls.group,
+                text=f'Пост {number}',
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def generate(self):
+        return sitemaps.generate(self.directory, BASE_URL)
+
+    def read(self, filename):
+        with open(os.path.join(self.directory, filename)) as file:
+            content = file.read()
+        with gzip.open(os.path.join(self.directory, filename + '.gz')) as file:
+            self.assertEqual(file.read().decode(), content)
+        return content
+
+    def shard(self, section, pk):
+        return sitemaps.shard_filename(section, (pk - 1) // 2)
+
+    def test_generate(self):
+        """Индекс ссылается на шарды, в шардах - все адреса."""
+        regenerated, total = self.generate()
+        self.assertEqual(regenerated, total)
+        index = self.read(sitemaps.INDEX)
+        content = ''
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith('.xml') and filename != sitemaps.INDEX:
+                self.assertIn(f'{BASE_URL}/sitemaps/{filename}', index)
+                content += self.read(filename)
+        for post in self.posts:
+            self.assertIn(f'{BASE_URL}/posts/{post.pk}/<', content)
+        for author in self.authors:
+            self.assertIn(f'{BASE_URL}/profile/{author.username}/<', content)
+        self.assertIn(f'{BASE_URL}/group/{self.group.slug}/<', content)
+
+    def test_only_changed_shards_regenerated(self):
+        self.generate()
+        self.assertEqual(self.generate()[0], 0)
+        post = Post.objects.create(author=self.authors[2], text='Новый пост')
+        regenerated, _ = self.generate()
+        # Шард поста и шард профиля его автора, группа не изменилась
+        self.assertEqual(regenerated, 2)
+        self.assertIn(
+            f'/posts/{post.pk}/<',
+            self.read(self.shard(sitemaps.PostsSection, post.pk))
+        )
+
+    def test_removed_shards_deleted(self):
+        self.generate()
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[4:]]) \
+            .delete()
+        self.generate()
+        filename = self.shard(sitemaps.PostsSection, self.posts[4].pk)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.directory, filename))
+        )
+        self.assertNotIn(filename, self.read(sitemaps.INDEX))
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'generate_sitemaps', output=self.directory, base_url=BASE_URL,
+            stdout=out,
+        )
+        self.assertIn('перегенерировано', out.getvalue())
@@ -1,3 +1,4 @@
+import re
 import shutil
 import tempfile
 from typing import ClassVar
@@ -283,6 +284,23 @@ class CacheViewsTests(TestCase):
         response3 = self.guest_client.get(reverse('posts:index'))
         self.assertNotEqual(cache_data, response3.content)
 
+    def test_new_post_shown_on_cached_pages(self):
+        """Новый пост сразу виден в закэшированных профиле и группе."""
+        urls = (
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=self.user, text='Только что опубликован', group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Только что опубликован'
+                )
+
 
 class PaginatorViewsTests(TestCase):
     """Тесты для проверки паджинатора."""
@@ -325,6 +343,95 @@ class PaginatorViewsTests(TestCase):
         )
 
 
+class MoreViewsTests(TestCase):
+    """Тесты подгрузки ленты порциями (бесконечная прокрутка)."""
+
+    fixtures = [
+        "fixture_posts_users.json",
+        "fixture_posts_groups.json",
+        "fixture_posts_posts.json"
+    ]
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def more_url(html):
+        found = re.search(r'data-more="([^"]+)"', html)
+        return found and found.group(1).replace('&amp;', '&')
+
+    @staticmethod
+    def post_ids(html):
+        return [
+            int(pk) for pk in re.findall(r'href="/posts/(\d+)/"', html)
+        ]
+
+    def scroll(self, page_url, queries=2):
+        """
+        Посты первой страницы и всех подгруженных порций. queries -
+        запросов на порцию: посты и число их отметок «нравится», а для
+        авторизованного ещё сессия, пользователь и его отметки.
+        """
+        html = self.client.get(page_url).content.decode()
+        ids = self.post_ids(html)
+        url = self.more_url(html)
+        while url:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertNotIn('<html', response.content.decode())
+            html = response.content.decode()
+            ids += self.post_ids(html)
+            url = self.more_url(html)
+        return ids
+
+    def test_scroll_shows_all_posts(self):
+        """Прокрутка показывает все посты ленты по порядку без повторов."""
+        cases = (
+            (reverse('posts:index'), Post.objects.all()),
+            (
+                reverse('posts:group_list', args=['test-group-1']),
+                Post.objects.filter(group__slug='test-group-1'),
+            ),
+            (
+                reverse('posts:profile', args=['user1']),
+                Post.objects.filter(author__username='user1'),
+            ),
+        )
+        for url, posts in cases:
+            with self.subTest(url=url):
+                cache.clear()
+                expected = list(posts.order_by('-pub_date', 'pk').values_list(
+                    'pk', flat=True
+                ))
+                self.assertEqual(self.scroll(url), expected)
+
+    def test_follow_more(self):
+        author = User.objects.get(username='user1')
+        user = User.objects.create_user(username='follower')
+        Follow.objects.create(user=user, author=author)
+        self.client.force_login(user)
+        self.assertEqual(
+            self.scroll(reverse('posts:follow_index'), queries=5),
+            list(author.posts.order_by('-pub_date', 'pk').values_list(
+                'pk', flat=True
+            ))
+        )
+        self.client.logout()
+        response = self.client.get(reverse('posts:follow_more'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_json_and_errors(self):
+        url = reverse('posts:index_more')
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(set(data), {'html', 'next'})
+        self.assertEqual(
+            len(self.post_ids(data['html'])), settings.POSTS_LIMIT
+        )
+        self.assertEqual(self.more_url(data['html']), data['next'])
+        response = self.client.get(url, {'cursor': 'испорчен'})
+        self.assertEqual(response.status_code, 400)
+
+
 class FollowerViewsTest(TestCase):
     """Тесты для проверки подписчиков."""
 
@@ -0,0 +1,174 @@
+import fcntl
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import writebehind
+from ..models import Comment, Post, User
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND='memory', COMMENT_FLUSH_INTERVAL=60
+)
+class WriteBehindTests(TransactionTestCase):
+    """Тесты отложенной записи комментариев."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client.force_login(self.author)
+        self.other_client = Client()
+        self.other_client.force_login(self.other)
+        self.addCleanup(writebehind.writer.close)
+
+    def comment(self, text, post_id=None):
+        return self.client.post(
+            reverse('posts:add_comment', args=[post_id or self.post.pk]),
+            {'text': text}
+        )
+
+    def test_comments_written_in_one_batch(self):
+        """Комментарии записываются одной вставкой в одной транзакции."""
+        for number in range(5):
+            response = self.comment(f'Комментарий {number}')
+            self.assertRedirects(
+                response, reverse('posts:post_detail', args=[self.post.pk])
+            )
+        self.assertFalse(Comment.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            writebehind.writer.close()
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 5)
+
+    def test_own_pending_comment_is_visible(self):
+        """Автор сразу видит свой комментарий, другие - после записи."""
+        self.comment('Ещё не в базе')
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.client.get(url), 'Ещё не в базе')
+        self.assertNotContains(self.other_client.get(url), 'Ещё не в базе')
+        writebehind.writer.close()
+        for client in (self.client, self.other_client):
+            self.assertContains(
+                client.get(url), 'Ещё не в базе', count=1
+            )
+
+    def test_deleted_post(self):
+        """Комментарии к удалённому посту не записываются."""
+        post_id = self.post.pk
+        self.comment('К удалённому посту')
+        self.post.delete()
+        writebehind.writer.close()
+        self.assertFalse(Comment.objects.exists())
+        response = self.comment('Поста нет', post_id)
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_author(self):
+        """Комментарии удалённого пользователя не задерживают очередь."""
+        self.other_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'От удалённого'}
+        )
+        self.comment('Остаётся')
+        self.other.delete()
+        self.assertEqual(writebehind.writer.flush(), 2)
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['Остаётся']
+        )
+
+    def test_rejected_comment_is_dropped(self):
+        """Отвергнутый базой комментарий отбрасывается, остальные пишутся."""
+        writebehind.writer.add(self.post.pk, self.author.pk, None)
+        self.comment('После ошибки')
+        with self.assertLogs('yatube.writebehind', 'ERROR'):
+            self.assertEqual(writebehind.writer.flush(), 2)
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['После ошибки']
+        )
+        self.assertEqual(writebehind.writer.flush(), 0)
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND='journal', COMMENT_FLUSH_INTERVAL=60
+)
+class JournalTests(TransactionTestCase):
+    """Тесты журнала отложенной записи."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_override = override_settings(
+            COMMENT_JOURNAL_DIR=directory.name
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def entry(self, token, text, queued=None):
+        return {
+            'token': token,
+            'post': self.post.pk,
+            'author': self.author.pk,
+            'text': text,
+            'queued': (queued or timezone.now()).isoformat(),
+        }
+
+    def test_journal_of_crashed_process_is_recovered(self):
+        """Незаписанное упавшим процессом досылает другой процесс."""
+        queued = timezone.now()
+        # Записан в базу, но отметить это в журнале процесс не успел
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Уже в базе'
+        )
+        records = [
+            {'add': self.entry('1', 'Записан', queued)},
+            {'add': self.entry('2', 'Потерян', queued)},
+            {'add': self.entry('3', 'Уже в базе', queued)},
+            {'done': ['1']},
+        ]
+        path = writebehind.CommentWriter.journal_path(999999999)
+        with open(path, 'w') as journal:
+            for record in records:
+                journal.write(json.dumps(record) + '\n')
+            journal.write('{"add": {"tok')
+        writer = writebehind.CommentWriter()
+        writer.add(self.post.pk, self.author.pk, 'Новый')
+        writer.close()
+        self.assertFalse(os.path.exists(path))
+        self.assertCountEqual(
+            Comment.objects.values_list('text', flat=True),
+            ['Уже в базе', 'Потерян', 'Новый']
+        )
+        # Всё записано - журнал пуст
+        self.assertEqual(os.path.getsize(writer.journal.name), 0)
+
+    def test_live_process_journal_is_not_taken(self):
+        """Журнал живого процесса заблокирован и не досылается."""
+        path = writebehind.CommentWriter.journal_path(999999998)
+        with open(path, 'w') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            journal.write(json.dumps({'add': self.entry('1', 'Чужой')}))
+            journal.write('\n')
+            journal.flush()
+            writer = writebehind.CommentWriter()
+            writer.add(self.post.pk, self.author.pk, 'Свой')
+            writer.close()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)), ['Свой']
+        )
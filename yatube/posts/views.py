@@ -1,10 +1,33 @@
+from itertools import chain
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.core.exceptions import PermissionDenied
+from django.http import (
+    Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_POST
 
+from . import counters, export, likes, writebehind
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
-from .func import paginator
+from .func import cursor_page, more_url, paginator, posts_changed
+
+
+def page_cache_context():
+    """
+    Срок и отметка изменения постов для кэша ленты: новый или изменённый
+    пост сразу меняет ключ фрагмента, поэтому кэш может жить долго.
+    """
+    return {
+        'page_cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+        'posts_changed': posts_changed(),
+    }
 
 
 def index(request: HttpRequest) -> HttpResponse:
@@ -13,10 +36,23 @@ def index(request: HttpRequest) -> HttpResponse:
     page_obj = paginator(post_list, request)
     context = {
         'page_obj': page_obj,
+        'live_events': settings.LIVE_EVENTS,
     }
     return render(request, template, context)
 
 
+def popular(request: HttpRequest) -> HttpResponse:
+    """Посты с наибольшим числом просмотров (posts.counters)."""
+    post_list = Post.objects.select_related('author', 'group', 'stats').filter(
+        stats__views__gt=0
+    ).order_by('-stats__views', '-pub_date')
+    page_obj = paginator(post_list, request)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
@@ -25,6 +61,7 @@ def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     context = {
         'group': group,
         'page_obj': page_obj,
+        **page_cache_context(),
     }
     return render(request, template, context)
 
@@ -41,6 +78,7 @@ def profile(request: HttpRequest, username: str) -> HttpResponse:
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        **page_cache_context(),
     }
     return render(request, template, context)
 
@@ -48,15 +86,19 @@ def profile(request: HttpRequest, username: str) -> HttpResponse:
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
     template = 'posts/post_detail.html'
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author', 'group', 'stats'),
         pk=post_id
     )
+    counters.views.hit(post.pk)
     form = CommentForm()
     comments = post.comments.select_related('author').all()
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'pending_comments': writebehind.pending_comments(
+            post, request.user, comments
+        ),
     }
     return render(request, template, context)
 
@@ -99,6 +141,8 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
 
 @login_required
 def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
+    if settings.COMMENT_WRITE_BEHIND:
+        return add_comment_later(request, post_id)
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -109,17 +153,161 @@ def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def add_comment_later(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Комментарий в очередь отложенной записи (posts.writebehind)."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    form = CommentForm(request.POST or None)
+    if form.is_valid():
+        writebehind.writer.add(
+            post_id, request.user.pk, form.cleaned_data['text']
+        )
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+def followed_posts(user):
+    """
+    Посты авторов, на которых подписан user. Соединение с подписками
+    читает посты каждого автора по post_author_pub_date_idx и сортирует
+    только их; EXISTS по всей ленте проверял бы каждый пост по индексу
+    pub_date, что при редких подписках намного дольше.
+    """
+    return Post.objects.select_related('author', 'group').filter(
+        author__following__user=user
+    )
+
+
 @login_required
 def follow_index(request: HttpRequest) -> HttpResponse:
     """Сообщения от авторов, на которых подписан пользователь."""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(post_list, request)
+    page_obj = paginator(followed_posts(request.user), request)
     context = {
         'page_obj': page_obj,
+        'live_events': settings.LIVE_EVENTS,
     }
     return render(request, 'posts/follow.html', context)
 
 
+def card_context(request: HttpRequest) -> dict:
+    """
+    Что нужно карточкам поста без контекст-процессоров: пользователь
+    и CSRF-токен для кнопки «нравится».
+    """
+    context = {'user': request.user}
+    if request.user.is_authenticated:
+        context['csrf_token'] = get_token(request)
+    return context
+
+
+def more_response(request: HttpRequest, post_list, url_name: str,
+                  *args, **flags) -> HttpResponse:
+    """
+    Следующая порция ленты после ?cursor= для бесконечной прокрутки:
+    только карточки постов, без base.html и контекст-процессоров.
+    С ?format=json - {"html": карточки, "next": адрес следующей порции}.
+    flags - show_group и show_author для includes/post.html.
+    """
+    try:
+        posts, cursor = cursor_page(post_list, request.GET.get('cursor'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    next_url = None
+    if cursor is not None:
+        last = posts[-1]
+        next_url = more_url(url_name, args, last.pub_date, last.pk)
+    html = render_to_string(
+        'includes/post_more.html',
+        dict(flags, posts=posts, next_url=next_url, **card_context(request))
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'html': html, 'next': next_url})
+    return HttpResponse(html)
+
+
+def index_more(request: HttpRequest) -> HttpResponse:
+    post_list = Post.objects.select_related('author', 'group')
+    return more_response(
+        request, post_list, 'posts:index_more',
+        show_group=True, show_author=True
+    )
+
+
+def group_more(request: HttpRequest, slug: str) -> HttpResponse:
+    # Группа не читается отдельным запросом: у неизвестной - пустая порция
+    post_list = Post.objects.select_related('author', 'group').filter(
+        group__slug=slug
+    )
+    return more_response(
+        request, post_list, 'posts:group_more', slug,
+        show_group=False, show_author=True
+    )
+
+
+def profile_more(request: HttpRequest, username: str) -> HttpResponse:
+    post_list = Post.objects.select_related('group').filter(
+        author__username=username
+    )
+    return more_response(
+        request, post_list, 'posts:profile_more', username,
+        show_group=True, show_author=False
+    )
+
+
+@login_required
+def follow_more(request: HttpRequest) -> HttpResponse:
+    return more_response(
+        request, followed_posts(request.user), 'posts:follow_more',
+        show_group=True, show_author=True
+    )
+
+
+def post_cards(request: HttpRequest) -> HttpResponse:
+    """
+    Карточки постов ?ids=1,2,3 от новых к старым - для новых постов,
+    о которых сообщили уведомления (posts.live).
+    """
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        return HttpResponseBadRequest('ids - список id через запятую')
+    posts = Post.objects.select_related('author', 'group').filter(
+        pk__in=ids[:settings.POSTS_LIMIT]
+    )
+    return HttpResponse(render_to_string('includes/post_more.html', {
+        'posts': posts,
+        'show_group': True,
+        'show_author': True,
+        **card_context(request),
+    }))
+
+
+def like_redirect(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Обратно на страницу с кнопкой, если она на этом сайте."""
+    referer = request.META.get('HTTP_REFERER')
+    if referer and is_safe_url(
+            referer, allowed_hosts={request.get_host()},
+            require_https=request.is_secure()):
+        return redirect(referer)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+def post_like(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Отметка «нравится» (posts.likes)."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    likes.like(request.user, post_id)
+    return like_redirect(request, post_id)
+
+
+@login_required
+@require_POST
+def post_unlike(request: HttpRequest, post_id: int) -> HttpResponse:
+    likes.unlike(request.user, post_id)
+    return like_redirect(request, post_id)
+
+
 @login_required
 def profile_follow(request: HttpRequest, username: str) -> HttpResponse:
     """Подписаться на автора"""
@@ -135,6 +323,56 @@ def profile_unfollow(request: HttpRequest, username: str) -> HttpResponse:
     """Дизлайк, отписка."""
     user = request.user
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.get(user=user, author=author)
-    follow.delete()
+    Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', author)
+
+
+def export_response(request: HttpRequest, querysets,
+                    filename: str) -> StreamingHttpResponse:
+    """Потоковая выгрузка в формате из параметра ?format=."""
+    output = request.GET.get('format', 'jsonl')
+    if output not in export.FORMATS:
+        raise Http404(f'Неизвестный формат выгрузки: {output}')
+    posts, comments = querysets
+    if output == 'zip':
+        content = export.zip_archive(posts, comments)
+        content_type = 'application/zip'
+    else:
+        lines = export.jsonl if output == 'jsonl' else export.csv_lines
+        content = lines(chain(
+            export.post_records(posts), export.comment_records(comments)
+        ))
+        content_type = {
+            'jsonl': 'application/x-ndjson; charset=utf-8',
+            'csv': 'text/csv; charset=utf-8',
+        }[output]
+    response = StreamingHttpResponse(
+        (chunk for chunk in content if chunk), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{output}"'
+    )
+    return response
+
+
+@login_required
+def profile_export(request: HttpRequest,
+                   username: str) -> StreamingHttpResponse:
+    """Выгрузка постов и комментариев пользователя: ему самому и админам."""
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export_response(
+        request, export.author_querysets(author), f'yatube-{username}'
+    )
+
+
+@login_required
+def group_export(request: HttpRequest, slug: str) -> StreamingHttpResponse:
+    """Выгрузка постов группы с комментариями, только для админов."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        request, export.group_querysets(group), f'yatube-group-{slug}'
+    )
@@ -0,0 +1,288 @@
+"""
+Отложенная запись комментариев (COMMENT_WRITE_BEHIND).
+
+Комментарий не вставляется в базу в запросе пользователя, а попадает
+в очередь процесса. Фоновый поток раз в COMMENT_FLUSH_INTERVAL секунд
+записывает накопленное пачками через bulk_create в одной транзакции,
+поэтому поток комментариев к популярному посту берёт блокировку записи
+SQLite один раз на пачку, а не на каждый комментарий.
+
+Надёжность задаётся режимом:
+    'memory'  - очередь только в памяти: при падении процесса теряются
+                комментарии последнего интервала;
+    'journal' - перед ответом комментарий дописывается с fsync в журнал
+                процесса; журналы упавших процессов досылает любой
+                живой процесс при запуске своего потока записи.
+
+Дата комментария - момент записи в базу, он отстаёт от отправки не
+больше чем на интервал. Свои ещё не записанные комментарии
+пользователь видит сразу: они лежат в общем кэше до записи.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Post, User
+
+logger = logging.getLogger('yatube.writebehind')
+
+
+def pending_key(post_id, author_id):
+    return f'comments:pending:{post_id}:{author_id}'
+
+
+def pending_comments(post, user, comments):
+    """
+    Ещё не записанные комментарии user к post (новые сначала) - без тех,
+    что уже есть среди comments.
+    """
+    if not settings.COMMENT_WRITE_BEHIND or not user.is_authenticated:
+        return []
+    saved = {}
+    for comment in comments:
+        if comment.author_id == user.pk:
+            saved.setdefault(comment.text, comment.pub_date)
+    result = []
+    for entry in reversed(cache.get(pending_key(post.pk, user.pk), [])):
+        queued = parse_datetime(entry['queued'])
+        # Запись в базу могла опередить удаление из кэша
+        if entry['text'] in saved and saved[entry['text']] >= queued:
+            continue
+        result.append(Comment(
+            post=post, author=user, text=entry['text'], pub_date=queued
+        ))
+    return result
+
+
+def written_before(entries):
+    """
+    Какие из досылаемых из журнала комментариев уже в базе: процесс мог
+    упасть между записью пачки и отметкой об этом в журнале.
+    """
+    if not entries:
+        return set()
+    return set(Comment.objects.filter(
+        post_id__in={entry['post'] for entry in entries},
+        pub_date__gte=min(
+            parse_datetime(entry['queued']) for entry in entries
+        ),
+    ).values_list('post_id', 'author_id', 'text'))
+
+
+class CommentWriter:
+    """Очередь комментариев процесса и поток, записывающий её в базу."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def start(self):
+        """Очередь, журнал и поток - свои в каждом процессе после fork."""
+        self.pid = os.getpid()
+        self.pending = []
+        self.journal = None
+        if settings.COMMENT_WRITE_BEHIND == 'journal':
+            os.makedirs(settings.COMMENT_JOURNAL_DIR, exist_ok=True)
+            self.journal = open(self.journal_path(self.pid), 'a')
+            # Пока процесс жив, журнал заблокирован: чужие не досылаются
+            fcntl.flock(self.journal, fcntl.LOCK_EX)
+            self.recover()
+        threading.Thread(
+            target=self.run, name='comment-writer', daemon=True
+        ).start()
+
+    @staticmethod
+    def journal_path(pid):
+        return os.path.join(
+            settings.COMMENT_JOURNAL_DIR, f'comments-{pid}.jsonl'
+        )
+
+    def add(self, post_id, author_id, text):
+        """Ставит комментарий в очередь и в кэш ожидающих записи."""
+        entry = {
+            'token': uuid.uuid4().hex,
+            'post': post_id,
+            'author': author_id,
+            'text': text,
+            'queued': timezone.now().isoformat(),
+        }
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            self.log({'add': entry})
+            self.pending.append(entry)
+            size = len(self.pending)
+        key = pending_key(post_id, author_id)
+        cache.set(
+            key, cache.get(key, []) + [entry],
+            settings.COMMENT_PENDING_TIMEOUT
+        )
+        if size >= settings.COMMENT_BATCH_SIZE:
+            self.wakeup.set()
+        return entry
+
+    def log(self, record):
+        if self.journal is None:
+            return
+        self.journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def run(self):
+        while True:
+            self.wakeup.wait(settings.COMMENT_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            self.flush()
+            connection.close()
+
+    def flush(self):
+        """
+        Записывает очередь в базу. Комментарии, которые база отвергает
+        (IntegrityError), отбрасываются, а при других ошибках базы, например
+        заблокированной SQLite, пачка остаётся в очереди до повтора.
+        """
+        with self.lock:
+            if self.pid != os.getpid():
+                return 0
+            batch = self.pending[:settings.COMMENT_BATCH_SIZE]
+            del self.pending[:len(batch)]
+        if not batch:
+            return 0
+        try:
+            try:
+                self.write(batch)
+            except IntegrityError:
+                self.write_each(batch)
+        except DatabaseError as error:
+            logger.warning('Комментарии не записаны, повтор: %s', error)
+            # Часть пачки могла быть записана по одному: при повторе
+            # записанные находит written_before
+            for entry in batch:
+                entry['recovered'] = True
+            with self.lock:
+                self.pending[:0] = batch
+            return 0
+        with self.lock:
+            self.log({'done': [entry['token'] for entry in batch]})
+            if not self.pending and self.journal is not None:
+                self.journal.truncate(0)
+        self.forget(batch)
+        if len(self.pending) >= settings.COMMENT_BATCH_SIZE:
+            self.wakeup.set()
+        return len(batch)
+
+    @classmethod
+    def write_each(cls, batch):
+        """Пишет пачку по одному, отбрасывая отвергнутые базой."""
+        for entry in batch:
+            try:
+                cls.write([entry])
+            except IntegrityError as error:
+                logger.error(
+                    'Комментарий %s отброшен: %s', entry['token'], error
+                )
+
+    @staticmethod
+    def write(batch):
+        with transaction.atomic():
+            # Комментарии к удалённым за это время постам и от удалённых
+            # пользователей не записываются
+            posts = set(Post.objects.filter(
+                pk__in={entry['post'] for entry in batch}
+            ).values_list('pk', flat=True))
+            authors = set(User.objects.filter(
+                pk__in={entry['author'] for entry in batch}
+            ).values_list('pk', flat=True))
+            written = written_before(
+                [entry for entry in batch if entry.get('recovered')]
+            )
+            Comment.objects.bulk_create([
+                Comment(
+                    post_id=entry['post'],
+                    author_id=entry['author'],
+                    text=entry['text'],
+                )
+                for entry in batch
+                if entry['post'] in posts and entry['author'] in authors
+                and (entry['post'], entry['author'], entry['text'])
+                not in written
+            ])
+
+    @staticmethod
+    def forget(batch):
+        """Убирает записанные комментарии из кэша ожидающих."""
+        def user_post(entry):
+            return entry['post'], entry['author']
+
+        for (post, author), entries in groupby(
+                sorted(batch, key=user_post), user_post):
+            tokens = {entry['token'] for entry in entries}
+            key = pending_key(post, author)
+            left = [
+                entry for entry in cache.get(key, [])
+                if entry['token'] not in tokens
+            ]
+            if left:
+                cache.set(key, left, settings.COMMENT_PENDING_TIMEOUT)
+            else:
+                cache.delete(key)
+
+    def recover(self):
+        """Забирает в свою очередь незаписанное из журналов упавших."""
+        for path in glob.glob(self.journal_path('*')):
+            if path == self.journal.name:
+                continue
+            with open(path) as journal:
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                # Журнал мог успеть забрать и удалить другой процесс
+                if not os.path.exists(path) or (
+                        os.stat(path).st_ino != os.fstat(journal.fileno())
+                        .st_ino):
+                    continue
+                entries = self.unfinished(journal)
+                for entry in entries:
+                    entry['recovered'] = True
+                    self.log({'add': entry})
+                self.pending.extend(entries)
+                os.unlink(path)
+            logger.info('Из %s досланы комментарии: %s', path, len(entries))
+
+    @staticmethod
+    def unfinished(journal):
+        added = {}
+        for line in journal:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Строка, недописанная при падении
+                continue
+            if 'add' in record:
+                added[record['add']['token']] = record['add']
+            for token in record.get('done', ()):
+                added.pop(token, None)
+        return list(added.values())
+
+    def close(self):
+        """Дописывает очередь при штатной остановке процесса."""
+        while self.pid == os.getpid() and self.flush():
+            pass
+
+
+writer = CommentWriter()
+atexit.register(writer.close)
@@ -0,0 +1,63 @@
+// Новые посты без перезагрузки ленты: id приходят через server-sent
+// events, по нажатию кнопки их карточки вставляются в начало ленты
+(function () {
+  if (!('EventSource' in window)) {
+    return;
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.live').forEach(listen);
+  });
+
+  // Через сколько переподключаться, если сервер ответил ошибкой (503 -
+  // все потоки уведомлений заняты): после неё EventSource не повторяет
+  var BUSY_RETRY_MS = 30000;
+
+  function listen(live) {
+    var button = live.querySelector('button');
+    var count = live.querySelector('.live-count');
+    var ids = [];
+    var url = new URL(live.dataset.events, window.location.href);
+
+    function connect() {
+      var source = new EventSource(url);
+
+      source.addEventListener('post', function (event) {
+        url.searchParams.set('after', event.lastEventId);
+        if (ids.indexOf(event.data) === -1) {
+          ids.push(event.data);
+        }
+        count.textContent = ids.length;
+        button.hidden = false;
+      });
+
+      source.addEventListener('error', function () {
+        if (source.readyState === EventSource.CLOSED) {
+          setTimeout(connect, BUSY_RETRY_MS);
+        }
+      });
+    }
+
+    connect();
+
+    button.addEventListener('click', function () {
+      var url = live.dataset.cards + '?ids=' + ids.join(',');
+      ids = [];
+      button.hidden = true;
+      fetch(url, {credentials: 'same-origin'})
+        .then(function (response) {
+          return response.text();
+        })
+        .then(function (html) {
+          var cards = document.createElement('template');
+          cards.innerHTML = html.trim();
+          // Разделитель из начала порции нужен между ней и лентой
+          var first = cards.content.firstElementChild;
+          if (first && first.tagName === 'HR') {
+            cards.content.appendChild(first);
+          }
+          live.after(cards.content);
+        });
+    });
+  }
+})();
@@ -0,0 +1,52 @@
+// Бесконечная прокрутка: когда метка .more видна, на её место
+// подгружается следующая порция постов со своей меткой
+(function () {
+  if (!('IntersectionObserver' in window)) {
+    return;
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        load(entry.target);
+      }
+    });
+  }, {rootMargin: '400px'});
+
+  function watch() {
+    document.querySelectorAll('.more').forEach(function (marker) {
+      observer.observe(marker);
+    });
+  }
+
+  function load(marker) {
+    observer.unobserve(marker);
+    fetch(marker.dataset.more, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        marker.insertAdjacentHTML('afterend', html);
+        marker.remove();
+        watch();
+      })
+      .catch(function () {
+        observer.observe(marker);
+      });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    if (!document.querySelector('.more')) {
+      return;
+    }
+    // Страницы подгружаются прокруткой, номера страниц не нужны
+    document.querySelectorAll('nav[aria-label="Page navigation"]')
+      .forEach(function (nav) {
+        nav.hidden = true;
+      });
+    watch();
+  });
+})();
@@ -33,12 +33,33 @@ ALLOWED_HOSTS = [
     'testserver',
 ]
 
+# Общий для всех воркеров кэш в memory-mapped файле. Файл лежит в
+# каталоге проекта, а не в общем /tmp: записи кэша распаковываются
+# pickle, и подложенный чужой файл означал бы выполнение чужого кода.
+# default - обёртка над ним с защитой от cache stampede
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.stampede.StampedeProtectedCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'BETA': 1.0,
+            'LOCK_TIMEOUT': 10,
+            'STALE_TIMEOUT': 60,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.mmapped.MmapCache',
+        'LOCATION': os.path.join(BASE_DIR, 'run', 'yatube.cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
     }
 }
 
+# Тесты получают свои файлы кэша и журналов во временном каталоге
+TEST_RUNNER = 'core.testing.IsolatedTestRunner'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -51,21 +72,31 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.coalescing.RequestCoalescingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки импортируется и подключается только при разработке,
+# воркеры в рабочем окружении не тратят на неё время старта и запросов
+DEBUG_TOOLBAR = DEBUG
+
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -76,7 +107,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.instrumented.'
+                   'InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -158,9 +190,170 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Количество постов выводимых на страницу
 POSTS_LIMIT: int = 10
 
+# Сколько секунд хранить фрагменты лент групп и профилей. Ключ фрагмента
+# включает отметку изменения постов, так что новый пост виден сразу
+PAGE_CACHE_TIMEOUT: int = 60 * 15
+
+# Максимальное число запросов к базе для страницы авторизованного
+# пользователя. Не должно зависеть от количества постов на странице
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 7,
+    'posts:profile': 11,
+    'posts:post_detail': 7,
+    'posts:follow_index': 6,
+    'posts:popular': 6,
+}
+
+# Пиковый объём памяти в байтах при рендеринге страницы на худших
+# данных: посты по 20 000 символов, 2000 комментариев к посту
+MEMORY_BUDGETS = {
+    'posts:index': 3 * 2 ** 20,
+    'posts:group_list': 3 * 2 ** 20,
+    'posts:profile': 3 * 2 ** 20,
+    'posts:post_detail': 12 * 2 ** 20,
+    'posts:follow_index': 3 * 2 ** 20,
+}
+
+# Поиск N+1 запросов при рендеринге: 'warn', 'raise' или None
+NPLUSONE_DETECTION = 'warn' if DEBUG else None
+
+# Сколько строк читать из базы за раз при потоковой выгрузке
+EXPORT_CHUNK_SIZE: int = 2000
+
+# Сколько секунд хранить готовый XML RSS/Atom лент. Изменение поста
+# сбрасывает кэш всех лент сразу
+FEED_CACHE_TIMEOUT: int = 60 * 15
+
+# Статические sitemap-файлы (manage.py generate_sitemaps): адресов
+# в одном шарде, каталог и URL, под которым его раздаёт веб-сервер,
+# адрес сайта для абсолютных ссылок
+SITEMAP_SHARD_SIZE: int = 50000
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_URL = '/sitemaps/'
+SITEMAP_BASE_URL = 'http://localhost:8000'
+
+# Наибольшее число записей на странице JSON API и id в одном ?ids=
+API_MAX_LIMIT: int = 100
+
+# Уведомления о новых постах (server-sent events). Каждое соединение
+# занимает поток воркера, поэтому они включаются только на сервере,
+# рассчитанном на долгие соединения, и число потоков на процесс
+# ограничено LIVE_MAX_STREAMS. Дальше - общий журнал событий воркеров,
+# его размер до ротации, как часто его читать, через сколько секунд
+# тишины слать клиенту пинг и сколько держать соединение, после чего
+# браузер переподключается с Last-Event-ID. Журнал лежит в каталоге
+# проекта рядом с кэшем, а не в общем /tmp, где его может подменить
+# другой пользователь
+LIVE_EVENTS: bool = False
+LIVE_MAX_STREAMS: int = 8
+LIVE_EVENTS_FILE = os.path.join(BASE_DIR, 'run', 'yatube.events')
+LIVE_EVENTS_MAX_SIZE: int = 2 ** 20
+LIVE_POLL_INTERVAL: float = 0.5
+LIVE_HEARTBEAT: float = 15
+LIVE_MAX_AGE: float = 300
+
+# Отложенная запись комментариев пачками (posts.writebehind): None -
+# сразу в базу, 'memory' - очередь в памяти процесса, 'journal' - ещё и
+# журнал на диске, который переживает падение процесса
+COMMENT_WRITE_BEHIND = None
+COMMENT_FLUSH_INTERVAL: float = 0.5
+COMMENT_BATCH_SIZE: int = 500
+COMMENT_JOURNAL_DIR = os.path.join(BASE_DIR, 'journal')
+# Сколько секунд автор видит свой ещё не записанный комментарий
+COMMENT_PENDING_TIMEOUT: int = 60
+
+# Как часто воркер записывает накопленные просмотры постов (posts.counters)
+VIEW_COUNTER_FLUSH_INTERVAL: float = 5
+
+# Отметки «нравится» (posts.likes): на сколько строк делится счётчик
+# поста и сколько секунд кэшировать сумму (сбрасывается при отметке)
+LIKE_SHARDS: int = 8
+LIKE_COUNT_TIMEOUT: int = 60 * 60
+
 # Количество символов поста для метода str
 POST_TEXT_LIMIT: int = 15
 
 # Название папки для загрузки картинок внутри приложения
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Страницы, одинаковые запросы анонимов к которым объединяются
+COALESCE_URL_NAMES = (
+    'posts:index',
+    'posts:group_list',
+    'posts:post_detail',
+)
+
+# Сколько секунд ждать ответа ведущего запроса
+COALESCE_TIMEOUT: float = 5
+
+# Доля запросов, для которых собираются показатели производительности
+PERF_SAMPLE_RATE: float = 1.0
+
+# Метрики по представлениям, общие для всех воркеров. Снимки воркеров
+# лежат в каталоге проекта, а не в общем /tmp
+METRICS_ENABLED: bool = True
+# Токен для /internal/metrics/ (Authorization: Bearer ...), None - выдача
+# метрик отключена
+METRICS_TOKEN = None
+METRICS_DIR = os.path.join(BASE_DIR, 'run', 'metrics')
+METRICS_FLUSH_INTERVAL: float = 10
+
+# Запросы дольше этого числа секунд пишутся в журнал, None - отключено
+SLOW_QUERY_THRESHOLD: float = 0.1
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl')
+
+# Профилирование запросов: доля профилируемых запросов, профайлер
+# ('sampler' или 'cprofile'), интервал семплирования в секундах,
+# срок действия токена, каталог для результатов и сколько последних
+# файлов хранить для каждого представления
+PROFILE_SAMPLE_RATE: float = 0
+PROFILER = 'sampler'
+PROFILE_INTERVAL: float = 0.005
+PROFILE_TOKEN_MAX_AGE: int = 60 * 60
+PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+PROFILE_MAX_FILES: int = 50
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {
+            '()': 'django.utils.log.RequireDebugTrue',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['require_debug_true'],
+        },
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'yatube.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.live': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.writebehind': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'yatube.counters': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,32 @@
+"""
+Настройки рабочего окружения.
+
+Запуск: DJANGO_SETTINGS_MODULE=yatube.settings_production. Отладочные
+средства (панель отладки, поиск N+1) не импортируются и не подключаются,
+шаблоны кэшируются загрузчиком.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import ALLOWED_HOSTS, INSTALLED_APPS, MIDDLEWARE, SECRET_KEY
+
+DEBUG = False
+DEBUG_TOOLBAR = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)
+).split(',')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+
+NPLUSONE_DETECTION = None
+
+# Заголовок Server-Timing и журнал показателей - для выборки запросов
+PERF_SAMPLE_RATE: float = 0.01